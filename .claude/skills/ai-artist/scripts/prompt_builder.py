@@ -4,7 +4,7 @@
 AI Artist Prompt Builder - Generate comprehensive prompts from keywords
 """
 
-from core import search, search_all_domains, AVAILABLE_DOMAINS
+from core import search, search_batch, search_all_domains, AVAILABLE_DOMAINS
 
 
 def build_image_prompt(subject, style=None, platform="midjourney", context=None):
@@ -30,43 +30,53 @@ def build_image_prompt(subject, style=None, platform="midjourney", context=None)
         "platform_tips": None
     }
 
-    # Search for style if provided
+    # All lookups go through one batch so each CSV index is loaded once
+    specs = {
+        "subject": (subject, "subject", 1),
+        "quality": (f"{platform} quality professional", "quality", 3),
+        "platform": (platform, "platform", 1),
+    }
     if style:
-        style_result = search(style, "style", 1)
-        if style_result.get("results"):
-            s = style_result["results"][0]
-            components["style"] = s.get("Prompt Keywords", "")
-            components["lighting"] = s.get("Lighting", "")
-            components["composition"] = s.get("Composition", "")
-            components["negative"] = s.get("Negative Prompt", "")
-            components["platform_tips"] = s.get("Platform Tips", "")
-
-    # Search for subject-specific tips
-    subject_result = search(subject, "subject", 1)
+        specs["style"] = (style, "style", 1)
+    if context:
+        specs["domain"] = (context, "domain", 1)
+    found = dict(zip(specs, search_batch(specs.values())))
+    style_result = found.get("style", {})
+    subject_result = found["subject"]
+    quality_result = found["quality"]
+    platform_result = found["platform"]
+    domain_result = found.get("domain", {})
+
+    # Style components
+    if style_result.get("results"):
+        s = style_result["results"][0]
+        components["style"] = s.get("Prompt Keywords", "")
+        components["lighting"] = s.get("Lighting", "")
+        components["composition"] = s.get("Composition", "")
+        components["negative"] = s.get("Negative Prompt", "")
+        components["platform_tips"] = s.get("Platform Tips", "")
+
+    # Subject-specific tips
     if subject_result.get("results"):
         sub = subject_result["results"][0]
         components["subject_tips"] = sub.get("Tips", "")
         components["detail_keywords"] = sub.get("Detail Keywords", "")
 
-    # Search for quality modifiers
-    quality_result = search(f"{platform} quality professional", "quality", 3)
+    # Quality modifiers
     if quality_result.get("results"):
         components["quality"] = ", ".join([q.get("Modifier", "") for q in quality_result["results"]])
 
-    # Search for platform-specific guidance
-    platform_result = search(platform, "platform", 1)
+    # Platform-specific guidance
     if platform_result.get("results"):
         p = platform_result["results"][0]
         components["syntax"] = p.get("Syntax Examples", "")
         components["best_practices"] = p.get("Best Practices", "")
 
-    # Search for domain context
-    if context:
-        domain_result = search(context, "domain", 1)
-        if domain_result.get("results"):
-            d = domain_result["results"][0]
-            components["prompt_structure"] = d.get("Prompt Structure", "")
-            components["domain_mistakes"] = d.get("Common Mistakes", "")
+    # Domain context
+    if domain_result.get("results"):
+        d = domain_result["results"][0]
+        components["prompt_structure"] = d.get("Prompt Structure", "")
+        components["domain_mistakes"] = d.get("Common Mistakes", "")
 
     # Build the final prompt based on platform
     final_prompt = _assemble_prompt(components, platform)
@@ -82,51 +92,39 @@ def _assemble_prompt(components, platform):
     """Assemble prompt components into platform-optimized format"""
     platform_lower = platform.lower()
 
-    parts = [components["subject"]]
-
-    if components.get("style"):
-        parts.append(components["style"])
-
-    if components.get("lighting"):
-        parts.append(components["lighting"])
-
-    if components.get("composition"):
-        parts.append(components["composition"])
-
-    if components.get("quality"):
-        parts.append(components["quality"])
-
-    if components.get("detail_keywords"):
-        parts.append(components["detail_keywords"])
+    subject = components["subject"]
+    style = components.get("style")
+    lighting = components.get("lighting")
+    negative = components.get("negative")
+    parts = [x for x in (subject, style, lighting, components.get("composition"),
+                         components.get("quality"), components.get("detail_keywords")) if x]
 
     # Platform-specific formatting
     if "midjourney" in platform_lower:
-        prompt = ", ".join(filter(None, parts))
-        prompt += " --ar 16:9 --style raw --v 6.1"
-        if components.get("negative"):
-            prompt += f" --no {components['negative'].split(',')[0].strip()}"
+        prompt = ", ".join(parts) + " --ar 16:9 --style raw --v 6.1"
+        if negative:
+            prompt += f" --no {negative.split(',')[0].strip()}"
 
     elif "dall" in platform_lower:
         # DALL-E prefers natural language
-        prompt = f"Create an image of {components['subject']}. "
-        if components.get("style"):
-            prompt += f"Style: {components['style']}. "
-        if components.get("lighting"):
-            prompt += f"Lighting: {components['lighting']}. "
+        prompt = f"Create an image of {subject}. "
+        if style:
+            prompt += f"Style: {style}. "
+        if lighting:
+            prompt += f"Lighting: {lighting}. "
         prompt += "HD quality, professional."
 
     elif "stable" in platform_lower or "sd" in platform_lower:
         # SD uses weighted keywords
-        prompt = f"(masterpiece:1.4), (best quality:1.3), {', '.join(filter(None, parts))}"
-        if components.get("negative"):
-            prompt += f"\nNegative prompt: {components['negative']}"
+        prompt = f"(masterpiece:1.4), (best quality:1.3), {', '.join(parts)}"
+        if negative:
+            prompt += f"\nNegative prompt: {negative}"
 
     elif "flux" in platform_lower:
-        prompt = ", ".join(filter(None, parts))
-        prompt += ", high quality, detailed"
+        prompt = ", ".join(parts) + ", high quality, detailed"
 
     else:
-        prompt = ", ".join(filter(None, parts))
+        prompt = ", ".join(parts)
 
     return prompt
 
@@ -9,7 +9,6 @@ Domains: use-case, style, platform, technique, lighting
 Platforms: midjourney, dalle, sd, flux, nano-banana
 """
 
-import argparse
 import sys
 from core import CSV_CONFIG, MAX_RESULTS, search, search_all_domains
 
@@ -19,6 +18,11 @@ if sys.stdout.encoding and sys.stdout.encoding.lower() != "utf-8":
     if hasattr(sys.stdout, 'reconfigure'):
         sys.stdout.reconfigure(encoding="utf-8", errors="replace")
 
+# Long cell values are cut to this many characters in markdown output
+MAX_VALUE_CHARS = 400
+# Markdown line prefix per output column, built once
+_FIELD_PREFIXES = {col: f"- **{col}:** " for config in CSV_CONFIG.values() for col in config["output_cols"]}
+
 
 def format_output(result):
     """Format results for Claude consumption (token-optimized)"""
@@ -33,10 +37,12 @@ def format_output(result):
     for i, row in enumerate(result['results'], 1):
         output.append(f"### Result {i}")
         for key, value in row.items():
+            prefix = _FIELD_PREFIXES.get(key) or f"- **{key}:** "
             value_str = str(value)
-            if len(value_str) > 400:
-                value_str = value_str[:400] + "..."
-            output.append(f"- **{key}:** {value_str}")
+            if len(value_str) > MAX_VALUE_CHARS:
+                output.append(f"{prefix}{value_str[:MAX_VALUE_CHARS]}...")
+            else:
+                output.append(prefix + value_str)
         output.append("")
 
     return "\n".join(output)
@@ -111,6 +117,9 @@ def generate_prompt_system(query, platform=None):
 
 
 if __name__ == "__main__":
+    import argparse
+    import json
+
     parser = argparse.ArgumentParser(description="AI Artist Search")
     parser.add_argument("query", help="Search query")
     parser.add_argument("--domain", "-d", choices=list(CSV_CONFIG.keys()), help="Search domain")
@@ -131,7 +140,6 @@ if __name__ == "__main__":
     elif args.all:
         results = search_all_domains(args.query, args.max_results)
         if args.json:
-            import json
             print(json.dumps(results, indent=2, ensure_ascii=False))
         else:
             for domain, result in results.items():
@@ -141,7 +149,6 @@ if __name__ == "__main__":
     else:
         result = search(args.query, args.domain, args.max_results)
         if args.json:
-            import json
             print(json.dumps(result, indent=2, ensure_ascii=False))
         else:
             print(format_output(result))
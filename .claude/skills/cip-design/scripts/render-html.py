@@ -10,8 +10,12 @@ with detailed descriptions, concepts, and brand guidelines.
 import argparse
 import json
 import os
+import re
 import sys
 import base64
+import mmap
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
@@ -19,6 +23,16 @@ from datetime import datetime
 sys.path.insert(0, str(Path(__file__).parent))
 from core import search, get_cip_brief
 
+# Parallel image reads/encodes when embedding mockups
+MAX_IMAGE_WORKERS = 8
+
+# Mockup file extensions generate.py writes (its IMAGE_TYPES) and their data: URI mime types
+IMAGE_MIME_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".webp": "image/webp"
+}
+
 # Deliverable descriptions for presentation
 DELIVERABLE_INFO = {
     "business card": {
@@ -95,71 +109,25 @@ DELIVERABLE_INFO = {
     }
 }
 
+# Filename matchers, in DELIVERABLE_INFO order; a key must sit between -/_ separators
+_DELIV_KEYS = [
+    (re.compile(r'(?:^|[-_])' + r'[-_]'.join(map(re.escape, key.split(" "))) + r'(?:[-_.]|$)'), info)
+    for key, info in DELIVERABLE_INFO.items()
+]
 
-def get_image_base64(image_path):
-    """Convert image to base64 for embedding in HTML"""
-    try:
-        with open(image_path, "rb") as f:
-            return base64.b64encode(f.read()).decode('utf-8')
-    except Exception as e:
-        print(f"Warning: Could not load image {image_path}: {e}")
-        return None
-
-
-def get_deliverable_info(filename):
-    """Extract deliverable type from filename and get info"""
-    filename_lower = filename.lower()
-    for key, info in DELIVERABLE_INFO.items():
-        if key.replace(" ", "-") in filename_lower or key.replace(" ", "_") in filename_lower:
-            return info
-    # Default info
-    return {
-        "title": filename.replace("-", " ").replace("_", " ").title(),
-        "concept": "Brand identity application",
-        "purpose": "Extends brand presence across touchpoints",
-        "specs": "Custom specifications"
-    }
-
-
-def generate_html(brand_name, industry, images_dir, output_path=None, style=None):
-    """Generate HTML presentation from CIP images"""
-
-    images_dir = Path(images_dir)
-    if not images_dir.exists():
-        print(f"Error: Directory not found: {images_dir}")
-        return None
-
-    # Get all PNG images
-    images = sorted(images_dir.glob("*.png"))
-    if not images:
-        print(f"Error: No PNG images found in {images_dir}")
-        return None
-
-    # Get CIP brief for brand info
-    brief = get_cip_brief(brand_name, industry, style)
-    style_info = brief.get("style", {})
-    industry_info = brief.get("industry", {})
-
-    # Build HTML
-    html_parts = [f'''<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{brand_name} - Corporate Identity Program</title>
-    <style>
-        * {{
+# Static stylesheet; inlined into <style> or written next to the HTML with --external-css
+_CSS = """        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
-        body {{
+        }
+        body {
             font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif;
             background: #0a0a0a;
             color: #ffffff;
             line-height: 1.6;
-        }}
-        .hero {{
+        }
+        .hero {
             min-height: 100vh;
             display: flex;
             flex-direction: column;
@@ -168,8 +136,8 @@ def generate_html(brand_name, industry, images_dir, output_path=None, style=None
             text-align: center;
             padding: 4rem 2rem;
             background: linear-gradient(135deg, #1a1a2e 0%, #0a0a0a 100%);
-        }}
-        .hero h1 {{
+        }
+        .hero h1 {
             font-size: 4rem;
             font-weight: 700;
             letter-spacing: -0.02em;
@@ -177,156 +145,167 @@ def generate_html(brand_name, industry, images_dir, output_path=None, style=None
             background: linear-gradient(135deg, #ffffff 0%, #888888 100%);
             -webkit-background-clip: text;
             -webkit-text-fill-color: transparent;
-        }}
-        .hero .subtitle {{
+        }
+        .hero .subtitle {
             font-size: 1.5rem;
             color: #888;
             margin-bottom: 3rem;
-        }}
-        .hero .meta {{
+        }
+        .hero .meta {
             display: flex;
             gap: 3rem;
             flex-wrap: wrap;
             justify-content: center;
-        }}
-        .hero .meta-item {{
+        }
+        .hero .meta-item {
             text-align: center;
-        }}
-        .hero .meta-label {{
+        }
+        .hero .meta-label {
             font-size: 0.75rem;
             text-transform: uppercase;
             letter-spacing: 0.1em;
             color: #666;
             margin-bottom: 0.5rem;
-        }}
-        .hero .meta-value {{
+        }
+        .hero .meta-value {
             font-size: 1rem;
             color: #ccc;
-        }}
-        .section {{
+        }
+        .section {
             padding: 6rem 2rem;
             max-width: 1400px;
             margin: 0 auto;
-        }}
-        .section-title {{
+        }
+        .section-title {
             font-size: 2.5rem;
             font-weight: 600;
             margin-bottom: 1rem;
             color: #fff;
-        }}
-        .section-subtitle {{
+        }
+        .section-subtitle {
             font-size: 1.1rem;
             color: #888;
             margin-bottom: 4rem;
             max-width: 600px;
-        }}
-        .deliverable {{
+        }
+        .deliverable {
             display: grid;
             grid-template-columns: 1fr 1fr;
             gap: 4rem;
             margin-bottom: 8rem;
             align-items: center;
-        }}
-        .deliverable:nth-child(even) {{
+        }
+        .deliverable:nth-child(even) {
             direction: rtl;
-        }}
-        .deliverable:nth-child(even) > * {{
+        }
+        .deliverable:nth-child(even) > * {
             direction: ltr;
-        }}
-        .deliverable-image {{
+        }
+        .deliverable-image {
             position: relative;
             border-radius: 16px;
             overflow: hidden;
             box-shadow: 0 25px 50px -12px rgba(0, 0, 0, 0.5);
-        }}
-        .deliverable-image img {{
+        }
+        .deliverable-image img {
             width: 100%;
             height: auto;
             display: block;
-        }}
-        .deliverable-content {{
+        }
+        .deliverable-content {
             padding: 2rem 0;
-        }}
-        .deliverable-title {{
+        }
+        .deliverable-title {
             font-size: 2rem;
             font-weight: 600;
             margin-bottom: 1rem;
             color: #fff;
-        }}
-        .deliverable-concept {{
+        }
+        .deliverable-concept {
             font-size: 1.1rem;
             color: #aaa;
             margin-bottom: 1.5rem;
             font-style: italic;
-        }}
-        .deliverable-purpose {{
+        }
+        .deliverable-purpose {
             font-size: 1rem;
             color: #888;
             margin-bottom: 1.5rem;
             line-height: 1.8;
-        }}
-        .deliverable-specs {{
+        }
+        .deliverable-specs {
             display: inline-block;
             padding: 0.5rem 1rem;
             background: rgba(255, 255, 255, 0.05);
             border-radius: 8px;
             font-size: 0.85rem;
             color: #666;
-        }}
-        .color-palette {{
+        }
+        .color-palette {
             display: flex;
             gap: 1rem;
             margin-top: 2rem;
-        }}
-        .color-swatch {{
+        }
+        .color-swatch {
             width: 60px;
             height: 60px;
             border-radius: 12px;
             box-shadow: 0 4px 12px rgba(0, 0, 0, 0.3);
-        }}
-        .footer {{
+        }
+        .footer {
             text-align: center;
             padding: 4rem 2rem;
             border-top: 1px solid #222;
             color: #666;
-        }}
-        .footer p {{
+        }
+        .footer p {
             margin-bottom: 0.5rem;
-        }}
-        @media (max-width: 900px) {{
-            .hero h1 {{
+        }
+        @media (max-width: 900px) {
+            .hero h1 {
                 font-size: 2.5rem;
-            }}
-            .deliverable {{
+            }
+            .deliverable {
                 grid-template-columns: 1fr;
                 gap: 2rem;
-            }}
-            .deliverable:nth-child(even) {{
+            }
+            .deliverable:nth-child(even) {
                 direction: ltr;
-            }}
-        }}
-    </style>
+            }
+        }
+"""
+
+# HTML skeleton fragments, filled with str.format
+_HEAD_TMPL = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{brand_name} - Corporate Identity Program</title>
+{stylesheet}
 </head>
 <body>
-    <section class="hero">
+"""
+
+_HERO_TMPL = """    <section class="hero">
         <h1>{brand_name}</h1>
         <p class="subtitle">Corporate Identity Program</p>
         <div class="meta">
             <div class="meta-item">
                 <div class="meta-label">Industry</div>
-                <div class="meta-value">{industry_info.get("Industry", industry.title())}</div>
+                <div class="meta-value">{industry}</div>
             </div>
             <div class="meta-item">
                 <div class="meta-label">Style</div>
-                <div class="meta-value">{style_info.get("Style Name", "Corporate")}</div>
+                <div class="meta-value">{style_name}</div>
             </div>
             <div class="meta-item">
                 <div class="meta-label">Mood</div>
-                <div class="meta-value">{style_info.get("Mood", "Professional")}</div>
+                <div class="meta-value">{mood}</div>
             </div>
             <div class="meta-item">
                 <div class="meta-label">Deliverables</div>
-                <div class="meta-value">{len(images)} Items</div>
+                <div class="meta-value">{count} Items</div>
             </div>
         </div>
     </section>
@@ -337,53 +316,131 @@ def generate_html(brand_name, industry, images_dir, output_path=None, style=None
             Comprehensive identity system designed to maintain consistency
             across all brand touchpoints and communications.
         </p>
-''']
-
-    # Add each deliverable
-    for i, image_path in enumerate(images):
-        info = get_deliverable_info(image_path.stem)
-        img_base64 = get_image_base64(image_path)
-
-        if img_base64:
-            img_src = f"data:image/png;base64,{img_base64}"
-        else:
-            img_src = str(image_path)
+"""
 
-        html_parts.append(f'''
+# The image source is streamed between these two so the base64 payload is never copied
+_DELIVERABLE_OPEN = '''
         <div class="deliverable">
             <div class="deliverable-image">
-                <img src="{img_src}" alt="{info['title']}" loading="lazy">
+                <img src="'''
+
+_DELIVERABLE_TMPL = '''" alt="{title}" loading="lazy">
             </div>
             <div class="deliverable-content">
-                <h3 class="deliverable-title">{info['title']}</h3>
-                <p class="deliverable-concept">{info['concept']}</p>
-                <p class="deliverable-purpose">{info['purpose']}</p>
-                <span class="deliverable-specs">{info['specs']}</span>
+                <h3 class="deliverable-title">{title}</h3>
+                <p class="deliverable-concept">{concept}</p>
+                <p class="deliverable-purpose">{purpose}</p>
+                <span class="deliverable-specs">{specs}</span>
             </div>
         </div>
-''')
+'''
 
-    # Close HTML
-    html_parts.append(f'''
+_FOOTER_TMPL = """
     </section>
 
     <footer class="footer">
         <p><strong>{brand_name}</strong> Corporate Identity Program</p>
-        <p>Generated on {datetime.now().strftime("%B %d, %Y")}</p>
+        <p>Generated on {date}</p>
         <p style="margin-top: 1rem; font-size: 0.8rem;">Powered by CIP Design Skill</p>
     </footer>
 </body>
 </html>
-''')
+"""
+
+
+def get_image_base64(image_path):
+    """Convert image to base64 for embedding in HTML"""
+    try:
+        # Encode straight from the mapped file instead of reading a bytes copy first
+        with open(image_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return base64.b64encode(mm).decode('ascii')
+    except Exception as e:
+        print(f"Warning: Could not load image {image_path}: {e}")
+        return None
 
-    html_content = "".join(html_parts)
+
+def get_deliverable_info(filename):
+    """Extract deliverable type from filename and get info"""
+    filename_lower = filename.lower()
+    for pattern, info in _DELIV_KEYS:
+        if pattern.search(filename_lower):
+            return info
+    # Default info
+    return {
+        "title": filename.replace("-", " ").replace("_", " ").title(),
+        "concept": "Brand identity application",
+        "purpose": "Extends brand presence across touchpoints",
+        "specs": "Custom specifications"
+    }
+
+
+def generate_html(brand_name, industry, images_dir, output_path=None, style=None,
+                  external_css=False):
+    """Generate HTML presentation from CIP images"""
+
+    images_dir = Path(images_dir)
+    if not images_dir.exists():
+        print(f"Error: Directory not found: {images_dir}")
+        return None
+
+    # Get all mockup images
+    images = sorted(path for path in images_dir.iterdir() if path.suffix in IMAGE_MIME_TYPES and path.is_file())
+    if not images:
+        print(f"Error: No PNG, JPEG or WebP images found in {images_dir}")
+        return None
+
+    # Get CIP brief for brand info
+    brief = get_cip_brief(brand_name, industry, style)
+    style_info = brief.get("style", {})
+    industry_info = brief.get("industry", {})
 
     # Save HTML
     output_path = output_path or images_dir / f"{brand_name.lower().replace(' ', '-')}-cip-presentation.html"
     output_path = Path(output_path)
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(html_content)
+    if external_css:
+        css_path = output_path.with_suffix(".css")
+        css_path.write_text(_CSS, encoding="utf-8")
+        stylesheet = f'    <link rel="stylesheet" href="{css_path.name}">'
+    else:
+        stylesheet = f"    <style>\n{_CSS}    </style>"
+
+    # Stream the page straight to disk so the embedded images are never held twice
+    with open(output_path, "w", encoding="utf-8") as out:
+        out.write(_HEAD_TMPL.format(brand_name=brand_name, stylesheet=stylesheet))
+        out.write(_HERO_TMPL.format(
+            brand_name=brand_name,
+            industry=industry_info.get("Industry", industry.title()),
+            style_name=style_info.get("Style Name", "Corporate"),
+            mood=style_info.get("Mood", "Professional"),
+            count=len(images),
+        ))
+
+        # Add each deliverable; images are read and encoded in parallel, results are written
+        # in order. Only MAX_IMAGE_WORKERS encodings are in flight at once, so finished
+        # base64 strings cannot pile up ahead of the writer.
+        with ThreadPoolExecutor(max_workers=min(MAX_IMAGE_WORKERS, len(images))) as executor:
+            pending = deque(executor.submit(get_image_base64, path) for path in images[:MAX_IMAGE_WORKERS])
+            for i, image_path in enumerate(images):
+                img_base64 = pending.popleft().result()
+                if i + MAX_IMAGE_WORKERS < len(images):
+                    pending.append(executor.submit(get_image_base64, images[i + MAX_IMAGE_WORKERS]))
+                info = get_deliverable_info(image_path.stem)
+
+                out.write(_DELIVERABLE_OPEN)
+                if img_base64:
+                    out.write(f"data:{IMAGE_MIME_TYPES[image_path.suffix]};base64,")
+                    out.write(img_base64)
+                else:
+                    out.write(str(image_path))
+                del img_base64  # drop the written image before waiting on the next one
+                out.write(_DELIVERABLE_TMPL.format(**info))
+
+        # Close HTML
+        out.write(_FOOTER_TMPL.format(
+            brand_name=brand_name,
+            date=datetime.now().strftime("%B %d, %Y"),
+        ))
 
     print(f"✅ HTML presentation generated: {output_path}")
     return str(output_path)
@@ -400,6 +457,9 @@ Examples:
 
   # Specify output path
   python render-html.py --brand "TopGroup" --industry "consulting" --images ./cip --output presentation.html
+
+  # Keep the stylesheet in a separate, cacheable file
+  python render-html.py --brand "TopGroup" --industry "consulting" --images ./cip --external-css
         """
     )
 
@@ -408,6 +468,8 @@ Examples:
     parser.add_argument("--style", "-s", help="Design style")
     parser.add_argument("--images", required=True, help="Directory containing CIP mockup images")
     parser.add_argument("--output", "-o", help="Output HTML file path")
+    parser.add_argument("--external-css", action="store_true",
+                        help="Write the stylesheet to a sibling .css file instead of inlining it")
 
     args = parser.parse_args()
 
@@ -416,7 +478,8 @@ Examples:
         industry=args.industry,
         images_dir=args.images,
         output_path=args.output,
-        style=args.style
+        style=args.style,
+        external_css=args.external_css
     )
 
 
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Build the ahead-of-time compiled BM25 kernel (bm25_ext) next to this script
+
+bm25_core uses bm25_ext for large corpora when it has been built; it never
+imports numba itself, so the search CLIs skip Numba's import and JIT compile.
+Rebuild after changing bm25_numba.py or upgrading Python/Numba.
+
+Usage:
+    python build_bm25_ext.py
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+try:
+    from numba.pycc import CC
+except ImportError:
+    print("Error: numba not installed (or too new to include numba.pycc)")
+    print("Install with: pip install numba")
+    sys.exit(1)
+
+from bm25_numba import score_terms
+
+
+def main():
+    cc = CC("bm25_ext")
+    cc.output_dir = str(Path(__file__).parent)
+    cc.verbose = False
+    # Same loop as the JIT kernel: scores[doc_ids[i]] += idf * impacts[i]
+    cc.export("score_terms", "void(f8[:], i4[:], f8[:], f8)")(score_terms.py_func)
+    cc.compile()
+    print(f"✅ Built {cc.output_file} in {cc.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,13 @@
 AI Artist Core - BM25 search engine for prompt engineering resources
 """
 
-import csv
-import re
+import sys
+from functools import partial
 from pathlib import Path
-from math import log
-from collections import defaultdict
+
+# Shared BM25 engine and index cache
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'common'))
+from bm25_core import BM25, get_index, project, search_csv
 
 # ============ CONFIGURATION ============
 DATA_DIR = Path(__file__).parent.parent / "data"
@@ -52,146 +54,125 @@ CSV_CONFIG = {
     }
 }
 
-
-# ============ BM25 IMPLEMENTATION ============
-class BM25:
-    """BM25 ranking algorithm for text search"""
-
-    def __init__(self, k1=1.5, b=0.75):
-        self.k1 = k1
-        self.b = b
-        self.corpus = []
-        self.doc_lengths = []
-        self.avgdl = 0
-        self.idf = {}
-        self.doc_freqs = defaultdict(int)
-        self.N = 0
-
-    def tokenize(self, text):
-        """Lowercase, split, remove punctuation, filter short words"""
-        text = re.sub(r'[^\w\s]', ' ', str(text).lower())
-        return [w for w in text.split() if len(w) > 2]
-
-    def fit(self, documents):
-        """Build BM25 index from documents"""
-        self.corpus = [self.tokenize(doc) for doc in documents]
-        self.N = len(self.corpus)
-        if self.N == 0:
-            return
-        self.doc_lengths = [len(doc) for doc in self.corpus]
-        self.avgdl = sum(self.doc_lengths) / self.N
-
-        for doc in self.corpus:
-            seen = set()
-            for word in doc:
-                if word not in seen:
-                    self.doc_freqs[word] += 1
-                    seen.add(word)
-
-        for word, freq in self.doc_freqs.items():
-            self.idf[word] = log((self.N - freq + 0.5) / (freq + 0.5) + 1)
-
-    def score(self, query):
-        """Score all documents against query"""
-        query_tokens = self.tokenize(query)
-        scores = []
-
-        for idx, doc in enumerate(self.corpus):
-            score = 0
-            doc_len = self.doc_lengths[idx]
-            term_freqs = defaultdict(int)
-            for word in doc:
-                term_freqs[word] += 1
-
-            for token in query_tokens:
-                if token in self.idf:
-                    tf = term_freqs[token]
-                    idf = self.idf[token]
-                    numerator = tf * (self.k1 + 1)
-                    denominator = tf + self.k1 * (1 - self.b + self.b * doc_len / self.avgdl)
-                    score += idf * numerator / denominator
-
-            scores.append((idx, score))
-
-        return sorted(scores, key=lambda x: x[1], reverse=True)
+AVAILABLE_DOMAINS = tuple(CSV_CONFIG)
 
 
 # ============ SEARCH FUNCTIONS ============
-def _load_csv(filepath):
-    """Load CSV and return list of dicts"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return list(csv.DictReader(f))
-
-
-def _search_csv(filepath, search_cols, output_cols, query, max_results):
-    """Core search function using BM25"""
-    if not filepath.exists():
-        return []
-
-    data = _load_csv(filepath)
+DOMAIN_KEYWORDS = {
+    "use-case": ["avatar", "profile", "thumbnail", "poster", "social", "youtube", "instagram", "marketing", "product", "e-commerce", "infographic", "comic", "game", "app", "web", "header", "banner"],
+    "style": ["style", "aesthetic", "photorealistic", "anime", "manga", "3d", "render", "illustration", "pixel", "watercolor", "oil", "cyberpunk", "vaporwave", "minimalist", "vintage", "retro"],
+    "platform": ["midjourney", "dalle", "dall-e", "stable diffusion", "flux", "nano banana", "gemini", "imagen", "ideogram", "leonardo", "firefly", "platform", "tool"],
+    "technique": ["prompt", "technique", "weight", "emphasis", "negative", "json", "structured", "iteration", "reference", "identity", "multi-panel", "search grounding"],
+    "lighting": ["lighting", "light", "shadow", "golden hour", "blue hour", "rembrandt", "butterfly", "neon", "volumetric", "softbox", "rim light", "studio"]
+}
 
-    # Build documents from search columns
-    documents = [" ".join(str(row.get(col, "")) for col in search_cols) for row in data]
+# Flattened once at import so each query is a single pass of C-level substring checks
+_KEYWORD_DOMAINS = tuple((kw, domain) for domain, keywords in DOMAIN_KEYWORDS.items() for kw in keywords)
 
-    # BM25 search
-    bm25 = BM25()
-    bm25.fit(documents)
-    ranked = bm25.score(query)
 
-    # Get top results with score > 0
-    results = []
-    for idx, score in ranked[:max_results]:
-        if score > 0:
-            row = data[idx]
-            results.append({col: row.get(col, "") for col in output_cols if col in row})
+def _domain_scores(query):
+    """Count DOMAIN_KEYWORDS hits per domain in query"""
+    query_lower = query.lower()
 
-    return results
+    scores = dict.fromkeys(DOMAIN_KEYWORDS, 0)
+    for kw, domain in _KEYWORD_DOMAINS:
+        if kw in query_lower:
+            scores[domain] += 1
+    return scores
 
 
 def detect_domain(query):
     """Auto-detect the most relevant domain from query"""
-    query_lower = query.lower()
-
-    domain_keywords = {
-        "use-case": ["avatar", "profile", "thumbnail", "poster", "social", "youtube", "instagram", "marketing", "product", "e-commerce", "infographic", "comic", "game", "app", "web", "header", "banner"],
-        "style": ["style", "aesthetic", "photorealistic", "anime", "manga", "3d", "render", "illustration", "pixel", "watercolor", "oil", "cyberpunk", "vaporwave", "minimalist", "vintage", "retro"],
-        "platform": ["midjourney", "dalle", "dall-e", "stable diffusion", "flux", "nano banana", "gemini", "imagen", "ideogram", "leonardo", "firefly", "platform", "tool"],
-        "technique": ["prompt", "technique", "weight", "emphasis", "negative", "json", "structured", "iteration", "reference", "identity", "multi-panel", "search grounding"],
-        "lighting": ["lighting", "light", "shadow", "golden hour", "blue hour", "rembrandt", "butterfly", "neon", "volumetric", "softbox", "rim light", "studio"]
-    }
-
-    scores = {domain: sum(1 for kw in keywords if kw in query_lower) for domain, keywords in domain_keywords.items()}
+    scores = _domain_scores(query)
     best = max(scores, key=scores.get)
     return best if scores[best] > 0 else "style"
 
 
-def search(query, domain=None, max_results=MAX_RESULTS):
-    """Main search function with auto-domain detection"""
+# Per-domain (file name, path, search(query, max_results)) bound once at import;
+# the index itself is still loaded lazily on first use
+_DOMAIN_SEARCH = {
+    domain: (config["file"], DATA_DIR / config["file"],
+             partial(search_csv, DATA_DIR / config["file"], config["search_cols"], config["output_cols"]))
+    for domain, config in CSV_CONFIG.items()
+}
+
+
+def search(query, domain=None, max_results=MAX_RESULTS, query_tokens=None):
+    """Main search function with auto-domain detection
+
+    query_tokens lets callers searching many domains tokenize the query once.
+    """
     if domain is None:
         domain = detect_domain(query)
 
-    config = CSV_CONFIG.get(domain, CSV_CONFIG["style"])
-    filepath = DATA_DIR / config["file"]
+    file, filepath, domain_search = _DOMAIN_SEARCH.get(domain, _DOMAIN_SEARCH["style"])
 
     if not filepath.exists():
         return {"error": f"File not found: {filepath}", "domain": domain}
 
-    results = _search_csv(filepath, config["search_cols"], config["output_cols"], query, max_results)
+    results = domain_search(query if query_tokens is None else query_tokens, max_results)
 
     return {
         "domain": domain,
         "query": query,
-        "file": config["file"],
+        "file": file,
         "count": len(results),
         "results": results
     }
 
 
+def search_batch(specs):
+    """Run several searches, loading each domain's index once and scoring its queries together
+
+    specs is a list of (query, domain, max_results) tuples; domain may be None
+    to auto-detect. Returns search()-style result dicts in the same order.
+    """
+    specs = [(query, domain or detect_domain(query), max_results) for query, domain, max_results in specs]
+    batch = [None] * len(specs)
+
+    for d in dict.fromkeys(domain for _, domain, _ in specs):
+        positions = [i for i, spec in enumerate(specs) if spec[1] == d]
+        config = CSV_CONFIG.get(d, CSV_CONFIG["style"])
+        filepath = DATA_DIR / config["file"]
+
+        if not filepath.exists():
+            for i in positions:
+                batch[i] = {"error": f"File not found: {filepath}", "domain": d}
+            continue
+
+        # Score the group once at its largest limit; each query then keeps its own top n
+        data, bm25 = get_index(filepath, config["search_cols"])
+        ranked = bm25.score_batch([specs[i][0] for i in positions], max(specs[i][2] for i in positions))
+        for i, hits in zip(positions, ranked):
+            query, _, max_results = specs[i]
+            results = project(data, hits[:max_results], config["output_cols"])
+            batch[i] = {
+                "domain": d,
+                "query": query,
+                "file": config["file"],
+                "count": len(results),
+                "results": results
+            }
+
+    return batch
+
+
 def search_all_domains(query, max_per_domain=2):
-    """Search across all domains for comprehensive results"""
+    """Search across all domains for comprehensive results
+
+    Domains without a keyword hit are skipped when their index contains none
+    of the query tokens, since they cannot score anything.
+    """
     all_results = {}
-    for domain in CSV_CONFIG.keys():
-        result = search(query, domain, max_per_domain)
+    query_tokens = BM25().tokenize(query)
+    keyword_hits = _domain_scores(query)
+    for domain, config in CSV_CONFIG.items():
+        filepath = DATA_DIR / config["file"]
+        if not keyword_hits.get(domain) and filepath.exists():
+            _, bm25 = get_index(filepath, config["search_cols"])
+            if not any(tok in bm25.vocab for tok in query_tokens):
+                continue
+        result = search(query, domain, max_per_domain, query_tokens=query_tokens)
         if result.get("count", 0) > 0:
             all_results[domain] = result
     return all_results
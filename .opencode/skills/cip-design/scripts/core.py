@@ -4,11 +4,14 @@
 CIP Design Core - BM25 search engine for Corporate Identity Program design guidelines
 """
 
-import csv
-import re
+import sys
+from copy import deepcopy
+from functools import lru_cache, partial
 from pathlib import Path
-from math import log
-from collections import defaultdict
+
+# Shared BM25 engine and index cache
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'common'))
+from bm25_core import search_csv
 
 # ============ CONFIGURATION ============
 DATA_DIR = Path(__file__).parent.parent / "data"
@@ -38,139 +41,87 @@ CSV_CONFIG = {
 }
 
 
-# ============ BM25 IMPLEMENTATION ============
-class BM25:
-    """BM25 ranking algorithm for text search"""
-
-    def __init__(self, k1=1.5, b=0.75):
-        self.k1 = k1
-        self.b = b
-        self.corpus = []
-        self.doc_lengths = []
-        self.avgdl = 0
-        self.idf = {}
-        self.doc_freqs = defaultdict(int)
-        self.N = 0
-
-    def tokenize(self, text):
-        """Lowercase, split, remove punctuation, filter short words"""
-        text = re.sub(r'[^\w\s]', ' ', str(text).lower())
-        return [w for w in text.split() if len(w) > 2]
-
-    def fit(self, documents):
-        """Build BM25 index from documents"""
-        self.corpus = [self.tokenize(doc) for doc in documents]
-        self.N = len(self.corpus)
-        if self.N == 0:
-            return
-        self.doc_lengths = [len(doc) for doc in self.corpus]
-        self.avgdl = sum(self.doc_lengths) / self.N
-
-        for doc in self.corpus:
-            seen = set()
-            for word in doc:
-                if word not in seen:
-                    self.doc_freqs[word] += 1
-                    seen.add(word)
-
-        for word, freq in self.doc_freqs.items():
-            self.idf[word] = log((self.N - freq + 0.5) / (freq + 0.5) + 1)
-
-    def score(self, query):
-        """Score all documents against query"""
-        query_tokens = self.tokenize(query)
-        scores = []
-
-        for idx, doc in enumerate(self.corpus):
-            score = 0
-            doc_len = self.doc_lengths[idx]
-            term_freqs = defaultdict(int)
-            for word in doc:
-                term_freqs[word] += 1
-
-            for token in query_tokens:
-                if token in self.idf:
-                    tf = term_freqs[token]
-                    idf = self.idf[token]
-                    numerator = tf * (self.k1 + 1)
-                    denominator = tf + self.k1 * (1 - self.b + self.b * doc_len / self.avgdl)
-                    score += idf * numerator / denominator
-
-            scores.append((idx, score))
-
-        return sorted(scores, key=lambda x: x[1], reverse=True)
-
-
 # ============ SEARCH FUNCTIONS ============
-def _load_csv(filepath):
-    """Load CSV and return list of dicts"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return list(csv.DictReader(f))
-
-
-def _search_csv(filepath, search_cols, output_cols, query, max_results):
-    """Core search function using BM25"""
-    if not filepath.exists():
-        return []
-
-    data = _load_csv(filepath)
-
-    # Build documents from search columns
-    documents = [" ".join(str(row.get(col, "")) for col in search_cols) for row in data]
-
-    # BM25 search
-    bm25 = BM25()
-    bm25.fit(documents)
-    ranked = bm25.score(query)
-
-    # Get top results with score > 0
-    results = []
-    for idx, score in ranked[:max_results]:
-        if score > 0:
-            row = data[idx]
-            results.append({col: row.get(col, "") for col in output_cols if col in row})
+DOMAIN_KEYWORDS = {
+    "deliverable": ["card", "letterhead", "envelope", "folder", "shirt", "cap", "badge", "signage", "vehicle", "car", "van", "stationery", "uniform", "merchandise", "packaging", "banner", "booth"],
+    "style": ["style", "minimal", "modern", "luxury", "vintage", "industrial", "elegant", "bold", "corporate", "organic", "playful"],
+    "industry": ["tech", "finance", "legal", "healthcare", "hospitality", "food", "fashion", "retail", "construction", "logistics"],
+    "mockup": ["mockup", "scene", "context", "photo", "shot", "lighting", "background", "studio", "lifestyle"]
+}
 
-    return results
+# Flattened once at import so each query is a single pass of C-level substring checks
+_KEYWORD_DOMAINS = tuple((kw, domain) for domain, keywords in DOMAIN_KEYWORDS.items() for kw in keywords)
 
 
 def detect_domain(query):
     """Auto-detect the most relevant domain from query"""
     query_lower = query.lower()
 
-    domain_keywords = {
-        "deliverable": ["card", "letterhead", "envelope", "folder", "shirt", "cap", "badge", "signage", "vehicle", "car", "van", "stationery", "uniform", "merchandise", "packaging", "banner", "booth"],
-        "style": ["style", "minimal", "modern", "luxury", "vintage", "industrial", "elegant", "bold", "corporate", "organic", "playful"],
-        "industry": ["tech", "finance", "legal", "healthcare", "hospitality", "food", "fashion", "retail", "construction", "logistics"],
-        "mockup": ["mockup", "scene", "context", "photo", "shot", "lighting", "background", "studio", "lifestyle"]
-    }
-
-    scores = {domain: sum(1 for kw in keywords if kw in query_lower) for domain, keywords in domain_keywords.items()}
+    scores = dict.fromkeys(DOMAIN_KEYWORDS, 0)
+    for kw, domain in _KEYWORD_DOMAINS:
+        if kw in query_lower:
+            scores[domain] += 1
     best = max(scores, key=scores.get)
     return best if scores[best] > 0 else "deliverable"
 
 
-def search(query, domain=None, max_results=MAX_RESULTS):
-    """Main search function with auto-domain detection"""
-    if domain is None:
-        domain = detect_domain(query)
-
-    config = CSV_CONFIG.get(domain, CSV_CONFIG["deliverable"])
-    filepath = DATA_DIR / config["file"]
+# Per-domain (file name, path, search(query, max_results)) bound once at import;
+# the index itself is still loaded lazily on first use
+_DOMAIN_SEARCH = {
+    domain: (config["file"], DATA_DIR / config["file"],
+             partial(search_csv, DATA_DIR / config["file"], config["search_cols"], config["output_cols"]))
+    for domain, config in CSV_CONFIG.items()
+}
 
-    if not filepath.exists():
-        return {"error": f"File not found: {filepath}", "domain": domain}
 
-    results = _search_csv(filepath, config["search_cols"], config["output_cols"], query, max_results)
+@lru_cache(maxsize=256)
+def _search_cached(query, domain, max_results, csv_signature):
+    """search() for a resolved domain; csv_signature ties each memo entry to one version of the CSV"""
+    file, filepath, domain_search = _DOMAIN_SEARCH.get(domain, _DOMAIN_SEARCH["deliverable"])
+    results = domain_search(query, max_results)
 
     return {
         "domain": domain,
         "query": query,
-        "file": config["file"],
+        "file": file,
         "count": len(results),
         "results": results
     }
 
 
+def search(query, domain=None, max_results=MAX_RESULTS):
+    """Main search function with auto-domain detection
+
+    Results are memoized per (query, domain, max_results) until the CSV
+    changes; every call returns its own copy, so callers may modify it.
+    """
+    if domain is None:
+        domain = detect_domain(query)
+
+    _, filepath, _ = _DOMAIN_SEARCH.get(domain, _DOMAIN_SEARCH["deliverable"])
+
+    try:
+        stat = filepath.stat()
+    except FileNotFoundError:
+        return {"error": f"File not found: {filepath}", "domain": domain}
+
+    return deepcopy(_search_cached(query, domain, max_results, (stat.st_mtime_ns, stat.st_size)))
+
+
+def search_batch(specs):
+    """Run several searches, loading each domain's index once and reusing memoized results
+
+    specs is a list of (query, domain, max_results) tuples; domain may be None
+    to auto-detect. Returns search()-style result dicts in the same order.
+    """
+    return [search(query, domain or detect_domain(query), max_results) for query, domain, max_results in specs]
+
+
+def invalidate_cache():
+    """Drop memoized search() results"""
+    _search_cached.cache_clear()
+
+
 def search_all(query, max_results=2):
     """Search across all domains and combine results"""
     all_results = {}
@@ -194,11 +145,11 @@ def get_cip_brief(brand_name, industry_query, style_query=None):
 
     # Get recommended deliverables for the industry
     key_deliverables = industry.get("Key Deliverables", "").split()
-    deliverable_results = []
-    for d in key_deliverables[:5]:
-        result = search(d, "deliverable", 1)
-        if result.get("results"):
-            deliverable_results.append(result["results"][0])
+    deliverable_results = [
+        result["results"][0]
+        for result in search_batch([(d, "deliverable", 1) for d in key_deliverables[:5]])
+        if result.get("results")
+    ]
 
     return {
         "brand_name": brand_name,
@@ -15,15 +15,30 @@ Image Editing (text-and-image-to-image):
 """
 
 import argparse
+import asyncio
+import base64
+import hashlib
+import io
 import json
 import os
+import random
+import shutil
 import sys
+import time
+from functools import lru_cache
+from itertools import count
 from pathlib import Path
 from datetime import datetime
 
 # Add parent directory for imports
 sys.path.insert(0, str(Path(__file__).parent))
-from core import search, get_cip_brief
+from core import search, search_batch, get_cip_brief
+
+# google-genai is imported once, on first API use (see _load_genai), so that
+# --prompt-only runs never pay for it
+genai = None
+types = None
+_GENAI_OK = None  # None until the first import attempt
 
 # Model options
 MODELS = {
@@ -31,10 +46,43 @@ MODELS = {
     "pro": "gemini-3-pro-image-preview"      # Nano Banana Pro - quality, 4K text
 }
 DEFAULT_MODEL = "flash"
+# Default requests-per-minute budget per model (override with --rpm)
+MODEL_RPM = {
+    "flash": 60,
+    "pro": 10
+}
+DEFAULT_LOGO_MAX_DIM = 1024  # Logo is a reference image; larger uploads only cost bandwidth
+DEFAULT_CONCURRENCY = 4  # Concurrent API requests for --set / --deliverables
+DEFAULT_DELIVERABLES = ["business card", "letterhead", "office signage", "vehicle", "polo shirt"]
+
+# Retry policy for transient API errors (rate limits, overload, timeouts)
+MAX_ATTEMPTS = 6
+RETRY_BASE_DELAY = 2   # seconds; doubles each attempt
+RETRY_MAX_DELAY = 60   # seconds
+_TRANSIENT_CODES = {429, 500, 502, 503, 504}
+_TRANSIENT_MARKERS = ("429", "resource_exhausted", "unavailable", "deadline_exceeded", "quota", "rate limit")
+
+# Response image types: mime type -> (magic bytes, file extension)
+IMAGE_TYPES = {
+    "image/png": (b"\x89PNG\r\n\x1a\n", ".png"),
+    "image/jpeg": (b"\xff\xd8\xff", ".jpg"),
+    "image/webp": (b"RIFF", ".webp")
+}
+# Batch API job polling: seconds between status checks, doubling up to the cap
+BATCH_POLL_INITIAL = 10
+BATCH_POLL_MAX = 120
+_BATCH_DONE_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+# Generated images keyed on sha256(prompt, model, aspect ratio, logo); --no-cache skips it
+CACHE_DIR = Path.home() / ".cache" / "cip-design"
+_B64_CHUNK = 4 * 1024 * 1024  # base64 chars decoded per write (multiple of 4)
 
 
-def load_logo_image(logo_path):
-    """Load logo image using PIL for Gemini image editing"""
+def load_logo_image(logo_path, max_dim=DEFAULT_LOGO_MAX_DIM):
+    """Load logo image using PIL for Gemini image editing
+
+    The logo is flattened to RGB and downscaled (aspect preserved) to fit
+    within max_dim x max_dim; max_dim=0 keeps the original size.
+    """
     try:
         from PIL import Image
     except ImportError:
@@ -50,21 +98,62 @@ def load_logo_image(logo_path):
     try:
         img = Image.open(logo_path)
         # Convert to RGB if necessary (Gemini works best with RGB)
-        if img.mode in ('RGBA', 'P'):
-            # Create white background for transparent images
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'RGBA':
-                background.paste(img, mask=img.split()[3])  # Use alpha channel as mask
+        if img.mode == 'RGB':
+            pass
+        elif img.mode == 'P' and 'transparency' not in img.info:
+            img = img.convert('RGB')
+        elif img.mode in ('RGBA', 'LA', 'PA', 'P'):
+            img = img.convert('RGBA')
+            alpha = img.getchannel('A')
+            if alpha.getextrema()[0] == 255:
+                # Fully opaque: no need for a background buffer
+                img = img.convert('RGB')
             else:
-                background.paste(img)
-            img = background
-        elif img.mode != 'RGB':
+                # Flatten transparent images onto a white background
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                background.paste(img, mask=alpha)
+                img = background
+        else:
             img = img.convert('RGB')
+
+        if max_dim:
+            img.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS)
+        # Decode now so every later use works on the in-memory pixels
+        img.load()
         return img
     except Exception as e:
         print(f"Error loading logo: {e}")
         return None
 
+# Parsed .env files keyed by path -> ((mtime_ns, size), {key: value})
+_ENV_CACHE = {}
+
+
+def _parse_env_file(env_path):
+    """Parse KEY=VALUE lines from an .env file, reusing the last parse while unchanged
+
+    A missing file parses as empty; the stat doubles as the existence check.
+    """
+    try:
+        st = env_path.stat()
+    except FileNotFoundError:
+        return {}
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _ENV_CACHE.get(env_path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    values = {}
+    with open(env_path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#") and "=" in line:
+                key, value = line.split("=", 1)
+                values.setdefault(key, value.strip('"\''))
+    _ENV_CACHE[env_path] = (stamp, values)
+    return values
+
+
 # Load environment variables
 def load_env():
     """Load environment variables from .env files"""
@@ -74,18 +163,82 @@ def load_env():
         Path.home() / ".claude" / ".env"
     ]
     for env_path in env_paths:
-        if env_path.exists():
-            with open(env_path) as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith("#") and "=" in line:
-                        key, value = line.split("=", 1)
-                        if key not in os.environ:
-                            os.environ[key] = value.strip('"\'')
+        for key, value in _parse_env_file(env_path).items():
+            if key not in os.environ:
+                os.environ[key] = value
 
 load_env()
 
 
+# Prompt phrases, joined with ", ". The {description} phrase is dropped when empty.
+_IMAGE_EDIT_PROMPT_PARTS = (
+    # Image editing prompt: instructs to USE the provided logo image
+    "Create a professional corporate identity mockup photograph of a {deliverable_name}",
+    "Use the EXACT logo from the provided image - do NOT modify or recreate the logo",
+    "The logo MUST appear exactly as shown in the input image",
+    "Place the logo on the {deliverable_name} at: {logo_placement}",
+    "Brand name: '{brand_name}'",
+    "{description}",
+    "Design style: {style_name}",
+    "Color scheme matching the logo colors",
+    "Materials: {materials} with {finishes} finish",
+    "Setting: {mockup_context}",
+    "Mood: {mood}",
+    "Photorealistic product photography",
+    "Soft natural lighting, professional studio quality",
+    "8K resolution, sharp details"
+)
+_TEXT_PROMPT_PARTS = (
+    # Pure text-to-image prompt
+    "Professional corporate identity mockup photograph",
+    "showing {deliverable_name} for brand '{brand_name}'",
+    "{description}",
+    "{style_name} design style",
+    "using colors {primary_colors}",
+    "{typography} typography",
+    "logo placement: {logo_placement}",
+    "{materials} materials with {finishes} finish",
+    "{mockup_context} setting",
+    "{mood} mood",
+    "photorealistic product photography",
+    "soft natural lighting",
+    "high quality professional shot",
+    "8k resolution detailed"
+)
+
+# Joined once at import: (use_logo_image, has_description) -> format string
+PROMPT_TEMPLATES = {
+    (use_logo, has_description): ", ".join(
+        part for part in parts if has_description or part != "{description}"
+    )
+    for use_logo, parts in ((True, _IMAGE_EDIT_PROMPT_PARTS), (False, _TEXT_PROMPT_PARTS))
+    for has_description in (True, False)
+}
+
+
+def _first_result(search_result):
+    """Top row of a search() result, or {} when it has none"""
+    return search_result["results"][0] if search_result.get("results") else {}
+
+
+def _shared_prompt_data(style=None, industry=None, mockup=None):
+    """Lookups that are the same for every deliverable of a brand
+
+    Returns (style_data, industry_data, mockup_scene); mockup_scene is None
+    when there is no mockup override.
+    """
+    # Get style details
+    style_data = _first_result(search(style, "style", 1)) if style else {}
+
+    # Get industry details
+    industry_data = _first_result(search(industry, "industry", 1)) if industry else {}
+
+    # Get mockup context
+    mockup_scene = _first_result(search(mockup, "mockup", 1)).get("Scene Description") if mockup else None
+
+    return style_data, industry_data, mockup_scene
+
+
 def build_cip_prompt(deliverable, brand_name, style=None, industry=None, mockup=None, use_logo_image=False):
     """Build an optimized prompt for CIP mockup generation
 
@@ -97,26 +250,34 @@ def build_cip_prompt(deliverable, brand_name, style=None, industry=None, mockup=
         mockup: Mockup context override
         use_logo_image: If True, prompt is optimized for image editing with logo
     """
-
     # Get deliverable details
-    deliverable_info = search(deliverable, "deliverable", 1)
-    deliverable_data = deliverable_info.get("results", [{}])[0] if deliverable_info.get("results") else {}
+    deliverable_data = _first_result(search(deliverable, "deliverable", 1))
+    return _compose_prompt(
+        deliverable, deliverable_data, brand_name, style,
+        *_shared_prompt_data(style, industry, mockup), use_logo_image
+    )
 
-    # Get style details
-    style_info = search(style or "corporate minimal", "style", 1) if style else {}
-    style_data = style_info.get("results", [{}])[0] if style_info.get("results") else {}
 
-    # Get industry details
-    industry_info = search(industry or "technology", "industry", 1) if industry else {}
-    industry_data = industry_info.get("results", [{}])[0] if industry_info.get("results") else {}
+def build_cip_prompts_batch(deliverables, brand_name, style=None, industry=None, mockup=None, use_logo_image=False):
+    """Build prompts for several deliverables of one brand
 
-    # Get mockup context
+    Same arguments and per-deliverable output as build_cip_prompt, but the
+    style/industry/mockup lookups run once for the whole list and the
+    deliverable lookups go through one search_batch call.
+    """
+    shared = _shared_prompt_data(style, industry, mockup)
+    deliverable_results = search_batch([(d, "deliverable", 1) for d in deliverables])
+    return [
+        _compose_prompt(deliverable, _first_result(result), brand_name, style, *shared, use_logo_image)
+        for deliverable, result in zip(deliverables, deliverable_results)
+    ]
+
+
+def _compose_prompt(deliverable, deliverable_data, brand_name, style, style_data, industry_data, mockup_scene, use_logo_image):
+    """Fill the prompt template from looked-up deliverable/style/industry rows"""
     mockup_context = deliverable_data.get("Mockup Context", "clean professional")
-    if mockup:
-        mockup_info = search(mockup, "mockup", 1)
-        if mockup_info.get("results"):
-            mockup_data = mockup_info["results"][0]
-            mockup_context = mockup_data.get("Scene Description", mockup_context)
+    if mockup_scene is not None:
+        mockup_context = mockup_scene
 
     # Build prompt components
     deliverable_name = deliverable_data.get("Deliverable", deliverable)
@@ -133,44 +294,20 @@ def build_cip_prompt(deliverable, brand_name, style=None, industry=None, mockup=
     mood = style_data.get("Mood", industry_data.get("Mood", "professional"))
 
     # Construct the prompt - different for image editing vs pure generation
-    if use_logo_image:
-        # Image editing prompt: instructs to USE the provided logo image
-        prompt_parts = [
-            f"Create a professional corporate identity mockup photograph of a {deliverable_name}",
-            f"Use the EXACT logo from the provided image - do NOT modify or recreate the logo",
-            f"The logo MUST appear exactly as shown in the input image",
-            f"Place the logo on the {deliverable_name} at: {logo_placement}",
-            f"Brand name: '{brand_name}'",
-            f"{description}" if description else "",
-            f"Design style: {style_name}",
-            f"Color scheme matching the logo colors",
-            f"Materials: {materials} with {finishes} finish",
-            f"Setting: {mockup_context}",
-            f"Mood: {mood}",
-            "Photorealistic product photography",
-            "Soft natural lighting, professional studio quality",
-            "8K resolution, sharp details"
-        ]
-    else:
-        # Pure text-to-image prompt
-        prompt_parts = [
-            f"Professional corporate identity mockup photograph",
-            f"showing {deliverable_name} for brand '{brand_name}'",
-            f"{description}" if description else "",
-            f"{style_name} design style",
-            f"using colors {primary_colors}",
-            f"{typography} typography",
-            f"logo placement: {logo_placement}",
-            f"{materials} materials with {finishes} finish",
-            f"{mockup_context} setting",
-            f"{mood} mood",
-            "photorealistic product photography",
-            "soft natural lighting",
-            "high quality professional shot",
-            "8k resolution detailed"
-        ]
-
-    prompt = ", ".join([p for p in prompt_parts if p])
+    template = PROMPT_TEMPLATES[use_logo_image, bool(description)]
+    prompt = template.format(
+        deliverable_name=deliverable_name,
+        brand_name=brand_name,
+        description=description,
+        logo_placement=logo_placement,
+        style_name=style_name,
+        primary_colors=primary_colors,
+        typography=typography,
+        materials=materials,
+        finishes=finishes,
+        mockup_context=mockup_context,
+        mood=mood
+    )
 
     return {
         "prompt": prompt,
@@ -183,30 +320,41 @@ def build_cip_prompt(deliverable, brand_name, style=None, industry=None, mockup=
     }
 
 
-def generate_with_nano_banana(prompt_data, output_dir=None, model_key="flash", aspect_ratio="1:1", logo_image=None):
-    """Generate image using Gemini Nano Banana (native image generation)
+def _load_genai():
+    """Import google-genai into the module globals once; returns whether it is available"""
+    global genai, types, _GENAI_OK
+    if _GENAI_OK is None:
+        try:
+            from google import genai as genai_module
+            from google.genai import types as types_module
+        except ImportError:
+            _GENAI_OK = False
+        else:
+            genai, types, _GENAI_OK = genai_module, types_module, True
+    return _GENAI_OK
 
-    Supports two modes:
-    1. Text-to-image: Pure prompt-based generation (logo_image=None)
-    2. Image editing: Text-and-image-to-image using provided logo (logo_image=PIL.Image)
 
-    Models:
-    - flash: gemini-2.5-flash-image (fast, cost-effective) - DEFAULT
-    - pro: gemini-3-pro-image-preview (quality, 4K text rendering)
+def _require_genai():
+    """_load_genai() that prints install instructions when google-genai is missing"""
+    if _load_genai():
+        return True
+    print("Error: google-genai package not installed.")
+    print("Install with: pip install google-genai")
+    return False
 
-    Args:
-        prompt_data: Dict with prompt, deliverable, brand, etc.
-        output_dir: Output directory for generated images
-        model_key: 'flash' or 'pro'
-        aspect_ratio: Output aspect ratio (1:1, 16:9, etc.)
-        logo_image: PIL.Image object of the brand logo for image editing mode
+
+@lru_cache(maxsize=1)
+def _client_for_key(api_key):
+    """One genai.Client per API key, so its HTTP session is reused across requests"""
+    return genai.Client(api_key=api_key)
+
+
+def _get_client():
+    """Get the shared Gemini client for the environment API key
+
+    Returns None after printing why if google-genai or the API key is missing.
     """
-    try:
-        from google import genai
-        from google.genai import types
-    except ImportError:
-        print("Error: google-genai package not installed.")
-        print("Install with: pip install google-genai")
+    if not _require_genai():
         return None
 
     api_key = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
@@ -214,76 +362,435 @@ def generate_with_nano_banana(prompt_data, output_dir=None, model_key="flash", a
         print("Error: GEMINI_API_KEY or GOOGLE_API_KEY not set")
         return None
 
-    client = genai.Client(api_key=api_key)
+    return _client_for_key(api_key)
+
+
+class RateLimiter:
+    """Spaces API requests at least 60/rpm seconds apart
+
+    Each caller reserves the next free slot before sleeping, so concurrent
+    tasks queue up behind each other instead of bursting. rpm <= 0 disables.
+    """
+
+    def __init__(self, rpm):
+        self.min_interval = 60.0 / rpm if rpm and rpm > 0 else 0.0
+        self._next_slot = 0.0
+
+    def _reserve(self):
+        """Claim the next slot; returns how long the caller must wait for it"""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.min_interval
+        return slot - now
+
+    def wait(self):
+        time.sleep(self._reserve())
+
+    async def wait_async(self):
+        await asyncio.sleep(self._reserve())
+
+
+@lru_cache(maxsize=None)
+def _rate_limiter(model_key, rpm):
+    """RateLimiter shared by every request to a model at this rpm, so consecutive
+    generate_with_nano_banana() calls and sets are spaced against each other too
+    """
+    return RateLimiter(rpm)
+
+
+class InvalidImageError(ValueError):
+    """Response image payload does not match its declared type (truncated or corrupt)"""
+
+
+def _is_transient(error):
+    """True if an API error is worth retrying (rate limit, overload, timeout, bad payload)"""
+    if isinstance(error, InvalidImageError):
+        return True
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        # A status code is authoritative; message text like "quota" also shows up in 4xx errors
+        return code in _TRANSIENT_CODES
+    message = str(error).lower()
+    return any(marker in message for marker in _TRANSIENT_MARKERS)
+
+
+def _retry_delay(attempt):
+    """Full-jitter exponential backoff delay before retry number `attempt` (0-based)"""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def _should_retry(error, attempt, deliverable):
+    """Decide whether to retry after a failed attempt; returns the delay or None"""
+    if attempt + 1 >= MAX_ATTEMPTS or not _is_transient(error):
+        return None
+    delay = _retry_delay(attempt)
+    print(f"   Retry {attempt + 1}/{MAX_ATTEMPTS - 1} for {deliverable} in {delay:.1f}s: {error}")
+    return delay
+
+
+def _image_data(response):
+    """First inline image of a generate_content response, validated against its
+    magic bytes; None if the response has no image
 
+    Raises InvalidImageError for a corrupt payload so the request is retried,
+    and ValueError for a mime type outside IMAGE_TYPES.
+    """
+    if response.candidates and response.candidates[0].content.parts:
+        for part in response.candidates[0].content.parts:
+            if hasattr(part, 'inline_data') and part.inline_data:
+                inline_data = part.inline_data
+                mime_type = getattr(inline_data, "mime_type", None) or "image/png"
+                if mime_type not in IMAGE_TYPES:
+                    # Neither validated nor embeddable by render-html.py; not worth a retry
+                    raise ValueError(f"Unsupported image type in response: {mime_type}")
+                data = inline_data.data
+                head = base64.b64decode(data[:16]) if isinstance(data, str) else data[:16]
+                if not head.startswith(IMAGE_TYPES[mime_type][0]):
+                    raise InvalidImageError(f"Response payload is not a valid {mime_type} image")
+                return inline_data
+    return None
+
+
+def _generate_image(client, model_name, contents, config, deliverable, limiter=None):
+    """Request an image with exponential backoff on transient errors; returns _image_data()"""
+    for attempt in range(MAX_ATTEMPTS):
+        if limiter:
+            limiter.wait()
+        try:
+            response = client.models.generate_content(model=model_name, contents=contents, config=config)
+            return _image_data(response)
+        except Exception as e:
+            delay = _should_retry(e, attempt, deliverable)
+            if delay is None:
+                raise
+            time.sleep(delay)
+
+
+async def _generate_image_async(client, model_name, contents, config, deliverable, limiter=None):
+    """Async counterpart of _generate_image using client.aio"""
+    for attempt in range(MAX_ATTEMPTS):
+        if limiter:
+            await limiter.wait_async()
+        try:
+            response = await client.aio.models.generate_content(model=model_name, contents=contents, config=config)
+            return _image_data(response)
+        except Exception as e:
+            delay = _should_retry(e, attempt, deliverable)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+
+
+def _logo_part(logo_image):
+    """Encode the logo as an inline PNG Part once, for reuse by every request; None without a logo"""
+    if logo_image is None:
+        return None
+    buf = io.BytesIO()
+    # Fast zlib level: the logo is small and only travels in the request
+    logo_image.save(buf, "PNG", optimize=False, compress_level=1)
+    return types.Part.from_bytes(data=buf.getvalue(), mime_type="image/png")
+
+
+def _prepare_request(prompt_data, model_key, aspect_ratio, logo_image, logo_part):
+    """Print the generation summary and return (model_name, contents, config)
+
+    logo_part is the _logo_part() encoding of logo_image, sent instead of the
+    PIL image so the SDK does not re-encode it for every request and retry.
+    """
     prompt = prompt_data["prompt"]
     model_name = MODELS.get(model_key, MODELS[DEFAULT_MODEL])
 
     # Determine mode
     mode = "image-editing" if logo_image else "text-to-image"
 
-    print(f"\n🎨 Generating CIP mockup...")
-    print(f"   Mode: {mode}")
-    print(f"   Deliverable: {prompt_data['deliverable']}")
-    print(f"   Brand: {prompt_data['brand']}")
-    print(f"   Style: {prompt_data['style']}")
-    print(f"   Model: {model_name}")
-    print(f"   Context: {prompt_data['mockup_context']}")
+    # One write per deliverable instead of one per line: fewer stdout writes and flushes
+    summary = [
+        f"\n🎨 Generating CIP mockup...",
+        f"   Mode: {mode}",
+        f"   Deliverable: {prompt_data['deliverable']}",
+        f"   Brand: {prompt_data['brand']}",
+        f"   Style: {prompt_data['style']}",
+        f"   Model: {model_name}",
+        f"   Context: {prompt_data['mockup_context']}"
+    ]
     if logo_image:
-        print(f"   Logo: Using provided image ({logo_image.size[0]}x{logo_image.size[1]})")
+        summary.append(f"   Logo: Using provided image ({logo_image.size[0]}x{logo_image.size[1]})")
+    print("\n".join(summary), flush=True)
 
-    try:
-        # Build contents: either just prompt or [prompt, image] for image editing
-        if logo_image:
-            # Image editing mode: pass both prompt and logo image
-            contents = [prompt, logo_image]
-        else:
-            # Text-to-image mode: just the prompt
-            contents = prompt
-
-        # Use generate_content with response_modalities=['IMAGE'] for Nano Banana
-        response = client.models.generate_content(
-            model=model_name,
-            contents=contents,
-            config=types.GenerateContentConfig(
-                response_modalities=['IMAGE'],  # Uppercase required
-                image_config=types.ImageConfig(
-                    aspect_ratio=aspect_ratio
-                )
-            )
+    # Build contents: either just prompt or [prompt, image] for image editing
+    if logo_part:
+        # Image editing mode: pass both prompt and logo image
+        contents = [prompt, logo_part]
+    else:
+        # Text-to-image mode: just the prompt
+        contents = prompt
+
+    # Use generate_content with response_modalities=['IMAGE'] for Nano Banana
+    config = types.GenerateContentConfig(
+        response_modalities=['IMAGE'],  # Uppercase required
+        image_config=types.ImageConfig(
+            aspect_ratio=aspect_ratio
         )
+    )
+    return model_name, contents, config
+
+
+def _write_payload(f, data):
+    """Write an inline_data payload; base64 text is decoded in chunks to keep memory flat"""
+    if isinstance(data, str):
+        for start in range(0, len(data), _B64_CHUNK):
+            f.write(base64.b64decode(data[start:start + _B64_CHUNK]))
+    else:
+        f.write(data)
+
+
+def _prepare_output(output_dir):
+    """Create the output directory once and stamp the run; returns (output_dir, timestamp)"""
+    output_dir = Path(output_dir or Path.cwd())
+    output_dir.mkdir(parents=True, exist_ok=True)
+    return output_dir, datetime.now().strftime("%Y%m%d_%H%M%S")
+
+
+def _output_path(prompt_data, output_dir, timestamp, extension):
+    """Output file path: <brand>-<deliverable>-<timestamp><extension>"""
+    brand_slug = prompt_data["brand"].lower().replace(" ", "-")
+    deliverable_slug = prompt_data["deliverable"].lower().replace(" ", "-")
+    return output_dir / f"{brand_slug}-{deliverable_slug}-{timestamp}{extension}"
 
-        # Extract image from response
-        if response.candidates and response.candidates[0].content.parts:
-            for part in response.candidates[0].content.parts:
-                if hasattr(part, 'inline_data') and part.inline_data:
-                    # Save image
-                    output_dir = output_dir or Path.cwd()
-                    output_dir = Path(output_dir)
-                    output_dir.mkdir(parents=True, exist_ok=True)
 
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    brand_slug = prompt_data["brand"].lower().replace(" ", "-")
-                    deliverable_slug = prompt_data["deliverable"].lower().replace(" ", "-")
-                    filename = f"{brand_slug}-{deliverable_slug}-{timestamp}.png"
-                    filepath = output_dir / filename
+def _open_output(prompt_data, output_dir, timestamp, extension):
+    """Create a new output file; returns (path, binary file opened for writing)
 
-                    image_data = part.inline_data.data
-                    with open(filepath, "wb") as f:
-                        f.write(image_data)
+    Every file of a set shares one timestamp and two deliverables can resolve to
+    the same CSV row, so a taken name gets a -2, -3, ... suffix instead of being
+    overwritten.
+    """
+    for n in count(1):
+        filepath = _output_path(prompt_data, output_dir, timestamp if n == 1 else f"{timestamp}-{n}", extension)
+        try:
+            return filepath, open(filepath, "xb")
+        except FileExistsError:
+            continue
+
+
+def _logo_digest(logo_image):
+    """sha256 of the logo pixels as sent (after flattening/downscaling); '' without a logo"""
+    if logo_image is None:
+        return ""
+    digest = hashlib.sha256(f"{logo_image.mode}{logo_image.size}".encode())
+    digest.update(logo_image.tobytes())
+    return digest.hexdigest()
 
-                    print(f"\n✅ Generated: {filepath}")
-                    return str(filepath)
 
+def _cache_key(prompt_data, model_key, aspect_ratio, logo_digest):
+    """Content address of a generation request"""
+    model_name = MODELS.get(model_key, MODELS[DEFAULT_MODEL])
+    request = "\0".join((prompt_data["prompt"], model_name, aspect_ratio, logo_digest))
+    return hashlib.sha256(request.encode()).hexdigest()
+
+
+def _from_cache(key, prompt_data, output_dir):
+    """Copy a cached image to a new output file; returns its path or None on a miss"""
+    for _, extension in IMAGE_TYPES.values():
+        cached = CACHE_DIR / f"{key}{extension}"
+        if cached.is_file():
+            output_dir, timestamp = _prepare_output(output_dir)
+            filepath, out = _open_output(prompt_data, output_dir, timestamp, extension)
+            with out, open(cached, "rb") as src:
+                shutil.copyfileobj(src, out)
+            print(f"\n♻️  Cached: {filepath} ({prompt_data['deliverable']})")
+            return str(filepath)
+    return None
+
+
+def _to_cache(key, filepath):
+    """Store a generated image under its cache key (best effort)"""
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        target = CACHE_DIR / f"{key}{Path(filepath).suffix}"
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        shutil.copyfile(filepath, tmp)
+        os.replace(tmp, target)
+    except OSError as e:
+        print(f"Warning: could not cache {filepath}: {e}")
+
+
+def _save_image(inline_data, prompt_data, output_dir, timestamp):
+    """Write an image returned by _image_data() into a _prepare_output() directory;
+    returns its path or None
+    """
+    if inline_data is None:
         print("No image generated in response")
         return None
 
+    extension = IMAGE_TYPES[getattr(inline_data, "mime_type", None) or "image/png"][1]
+    filepath, f = _open_output(prompt_data, output_dir, timestamp, extension)
+
+    # Write the API bytes verbatim: re-encoding through PIL would cost time and quality
+    with f:
+        _write_payload(f, inline_data.data)
+
+    print(f"\n✅ Generated: {filepath}")
+    return str(filepath)
+
+
+def generate_with_nano_banana(prompt_data, output_dir=None, model_key="flash", aspect_ratio="1:1", logo_image=None, rpm=None, client=None, use_cache=True):
+    """Generate image using Gemini Nano Banana (native image generation)
+
+    Supports two modes:
+    1. Text-to-image: Pure prompt-based generation (logo_image=None)
+    2. Image editing: Text-and-image-to-image using provided logo (logo_image=PIL.Image)
+
+    Models:
+    - flash: gemini-2.5-flash-image (fast, cost-effective) - DEFAULT
+    - pro: gemini-3-pro-image-preview (quality, 4K text rendering)
+
+    Args:
+        prompt_data: Dict with prompt, deliverable, brand, etc.
+        output_dir: Output directory for generated images
+        model_key: 'flash' or 'pro'
+        aspect_ratio: Output aspect ratio (1:1, 16:9, etc.)
+        logo_image: PIL.Image object of the brand logo for image editing mode
+        rpm: Requests-per-minute cap (default: MODEL_RPM for the model)
+        client: genai.Client to reuse (default: the shared client from _get_client)
+        use_cache: Reuse/store the image in CACHE_DIR for identical requests
+    """
+    if use_cache:
+        key = _cache_key(prompt_data, model_key, aspect_ratio, _logo_digest(logo_image))
+        filepath = _from_cache(key, prompt_data, output_dir)
+        if filepath:
+            return filepath
+
+    # types is needed to build the request even when the caller supplies the client
+    if not _require_genai():
+        return None
+    if client is None:
+        client = _get_client()
+        if client is None:
+            return None
+
+    logo_part = _logo_part(logo_image)
+    model_name, contents, config = _prepare_request(prompt_data, model_key, aspect_ratio, logo_image, logo_part)
+
+    try:
+        if rpm is None:
+            rpm = MODEL_RPM.get(model_key, MODEL_RPM[DEFAULT_MODEL])
+        image = _generate_image(client, model_name, contents, config, prompt_data["deliverable"], _rate_limiter(model_key, rpm))
+        filepath = _save_image(image, prompt_data, *_prepare_output(output_dir))
+        if filepath and use_cache:
+            _to_cache(key, filepath)
+        return filepath
+
     except Exception as e:
         print(f"Error generating image: {e}")
         return None
 
 
-def generate_cip_set(brand_name, industry, style=None, deliverables=None, output_dir=None, model_key="flash", logo_path=None, aspect_ratio="1:1"):
+async def _generate_many(client, prompts, output_dir, model_key, aspect_ratio, logo_image, logo_part, concurrency, rpm):
+    """Generate one image per prompt_data, keeping at most `concurrency` requests in flight
+    and starting at most `rpm` per minute
+
+    Returns (filepath, error) pairs in the order of prompts; exactly one of
+    the two is None.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    limiter = _rate_limiter(model_key, rpm)
+    # One directory check and one timestamp shared by every file in the set
+    output_dir, timestamp = _prepare_output(output_dir)
+
+    async def generate_one(prompt_data):
+        # Failures are reported per deliverable; one bad request or write must not abort gather()
+        try:
+            async with semaphore:
+                model_name, contents, config = _prepare_request(prompt_data, model_key, aspect_ratio, logo_image, logo_part)
+                image = await _generate_image_async(client, model_name, contents, config, prompt_data["deliverable"], limiter)
+            filepath = _save_image(image, prompt_data, output_dir, timestamp)
+        except Exception as e:
+            print(f"Error generating {prompt_data['deliverable']}: {e}")
+            return None, str(e)
+        return filepath, None if filepath else "No image generated in response"
+
+    return await asyncio.gather(*(generate_one(prompt_data) for prompt_data in prompts))
+
+
+def _generate_batch(client, prompts, output_dir, model_key, aspect_ratio, logo_image, logo_part):
+    """Submit every prompt as one Gemini Batch API job and wait for it to finish
+
+    Returns (filepath, error) pairs in the order of prompts like _generate_many,
+    or None if the job was not created, did not succeed or was cancelled after
+    repeated poll errors, so the caller can fall back to interactive requests
+    without paying for the images twice.
+    """
+    requests = []
+    for prompt_data in prompts:
+        model_name, contents, config = _prepare_request(prompt_data, model_key, aspect_ratio, logo_image, logo_part)
+        requests.append(types.InlinedRequest(contents=contents, config=config))
+
+    print(f"\n📦 Submitting {len(requests)} requests as one batch job")
+    print("   Batch jobs trade latency for throughput and may take minutes to hours;")
+    print("   output quality can differ slightly from interactive requests.")
+
+    try:
+        job = client.batches.create(
+            model=model_name,
+            src=requests,
+            config={"display_name": f"cip-{prompts[0]['brand']}"}
+        )
+    except Exception as e:
+        print(f"Batch job failed: {e}")
+        return None
+
+    # Once the job exists it is billed whether or not we see its results, so poll
+    # errors are retried with the growing poll delay instead of falling back
+    delay = BATCH_POLL_INITIAL
+    failures = 0
+    while job.state.name not in _BATCH_DONE_STATES:
+        time.sleep(delay)
+        delay = min(delay * 2, BATCH_POLL_MAX)
+        try:
+            job = client.batches.get(name=job.name)
+            failures = 0
+        except Exception as e:
+            failures += 1
+            if failures < MAX_ATTEMPTS:
+                print(f"Polling batch job failed ({e}), retrying in {delay}s")
+                continue
+            print(f"Polling batch job failed {failures} times: {e}")
+            try:
+                client.batches.cancel(name=job.name)
+            except Exception as cancel_error:
+                # The job may still finish and be billed: do not request every image again
+                print(f"Could not cancel batch job {job.name}: {cancel_error}")
+                return [(None, f"Batch job {job.name} status unknown: {e}")] * len(prompts)
+            print(f"Cancelled batch job {job.name}")
+            return None
+
+    if job.state.name != "JOB_STATE_SUCCEEDED":
+        print(f"Batch job ended with {job.state.name}")
+        return None
+
+    output_dir, timestamp = _prepare_output(output_dir)
+    responses = list(job.dest.inlined_responses or []) if job.dest else []
+    outcomes = []
+    for i, prompt_data in enumerate(prompts):
+        inlined = responses[i] if i < len(responses) else None
+        if inlined is None or inlined.error or not inlined.response:
+            error = str(inlined.error) if inlined and inlined.error else "No response in batch output"
+            print(f"Error generating {prompt_data['deliverable']}: {error}")
+            outcomes.append((None, error))
+            continue
+        try:
+            filepath = _save_image(_image_data(inlined.response), prompt_data, output_dir, timestamp)
+        except Exception as e:
+            print(f"Error generating {prompt_data['deliverable']}: {e}")
+            outcomes.append((None, str(e)))
+            continue
+        outcomes.append((filepath, None if filepath else "No image generated in response"))
+
+    return outcomes
+
+
+def generate_cip_set(brand_name, industry, style=None, deliverables=None, output_dir=None, model_key="flash", logo_path=None, aspect_ratio="1:1", concurrency=DEFAULT_CONCURRENCY, rpm=None, logo_max_dim=DEFAULT_LOGO_MAX_DIM, batch=False, use_cache=True, logo_image=None):
     """Generate a complete CIP set for a brand
 
     Args:
@@ -295,12 +802,22 @@ def generate_cip_set(brand_name, industry, style=None, deliverables=None, output
         model_key: 'flash' (fast) or 'pro' (quality)
         logo_path: Path to brand logo image for image editing mode
         aspect_ratio: Output aspect ratio
+        concurrency: Maximum number of API requests in flight at once
+        rpm: Requests-per-minute cap (default: MODEL_RPM for the model)
+        logo_max_dim: Downscale the logo to fit this size before upload (0 = original)
+        batch: Submit all deliverables as one Batch API job (falls back to
+            concurrent requests if the job fails)
+        use_cache: Reuse/store images in CACHE_DIR for identical requests
+        logo_image: Logo already loaded with load_logo_image (skips loading logo_path)
+
+    Returns:
+        One dict per deliverable: {deliverable, filepath, prompt} on success,
+        {deliverable, error} once retries are exhausted
     """
 
     # Load logo image if provided
-    logo_image = None
-    if logo_path:
-        logo_image = load_logo_image(logo_path)
+    if logo_image is None and logo_path:
+        logo_image = load_logo_image(logo_path, logo_max_dim)
         if not logo_image:
             print("Warning: Could not load logo, falling back to text-to-image mode")
 
@@ -309,31 +826,71 @@ def generate_cip_set(brand_name, industry, style=None, deliverables=None, output
 
     # Default deliverables if not specified
     if not deliverables:
-        deliverables = ["business card", "letterhead", "office signage", "vehicle", "polo shirt"]
+        deliverables = DEFAULT_DELIVERABLES
+
+    prompts = build_cip_prompts_batch(
+        deliverables,
+        brand_name=brand_name,
+        style=brief.get("style", {}).get("Style Name"),
+        industry=industry,
+        use_logo_image=(logo_image is not None)
+    )
 
+    # Identical earlier requests are served from the disk cache
+    outcomes = [None] * len(prompts)
+    if use_cache:
+        logo_digest = _logo_digest(logo_image)
+        keys = [_cache_key(prompt_data, model_key, aspect_ratio, logo_digest) for prompt_data in prompts]
+        for i, prompt_data in enumerate(prompts):
+            filepath = _from_cache(keys[i], prompt_data, output_dir)
+            if filepath:
+                outcomes[i] = (filepath, None)
+
+    pending = [i for i, outcome in enumerate(outcomes) if outcome is None]
+    if pending:
+        # One client shared by every request; only the network calls run concurrently
+        client = _get_client()
+
+        if rpm is None:
+            rpm = MODEL_RPM.get(model_key, MODEL_RPM[DEFAULT_MODEL])
+
+        pending_prompts = [prompts[i] for i in pending]
+        if client is None:
+            generated = [(None, "Gemini client unavailable")] * len(pending)
+        else:
+            # The logo is encoded once and the same Part is sent with every request
+            logo_part = _logo_part(logo_image)
+
+            generated = None
+            if batch:
+                generated = _generate_batch(client, pending_prompts, output_dir, model_key, aspect_ratio, logo_image, logo_part)
+                if generated is None:
+                    print("Falling back to concurrent requests")
+
+            if generated is None:
+                generated = asyncio.run(_generate_many(
+                    client, pending_prompts, output_dir, model_key, aspect_ratio, logo_image, logo_part, concurrency, rpm
+                ))
+
+        for i, outcome in zip(pending, generated):
+            outcomes[i] = outcome
+            if use_cache and outcome[0]:
+                _to_cache(keys[i], outcome[0])
+
+    # Failed deliverables are kept with their error so partial sets are visible
     results = []
-    for deliverable in deliverables:
-        prompt_data = build_cip_prompt(
-            deliverable=deliverable,
-            brand_name=brand_name,
-            style=brief.get("style", {}).get("Style Name"),
-            industry=industry,
-            use_logo_image=(logo_image is not None)
-        )
-
-        filepath = generate_with_nano_banana(
-            prompt_data,
-            output_dir,
-            model_key=model_key,
-            aspect_ratio=aspect_ratio,
-            logo_image=logo_image
-        )
+    for deliverable, prompt_data, (filepath, error) in zip(deliverables, prompts, outcomes):
         if filepath:
             results.append({
                 "deliverable": deliverable,
                 "filepath": filepath,
                 "prompt": prompt_data["prompt"]
             })
+        else:
+            results.append({
+                "deliverable": deliverable,
+                "error": error
+            })
 
     return results
 
@@ -379,6 +936,12 @@ Examples:
   # Generate CIP set with logo
   python generate.py --brand "TopGroup" --logo /path/to/logo.png --industry "consulting" --set
 
+  # Limit concurrent API requests for a set (default: 4)
+  python generate.py --brand "TopGroup" --logo logo.png --industry "consulting" --set --concurrency 2
+
+  # Submit a set as one Batch API job (higher throughput, results take longer)
+  python generate.py --brand "TopGroup" --logo logo.png --industry "consulting" --set --batch
+
   # Generate without logo (AI interprets brand)
   python generate.py --brand "TechFlow" --deliverable "business card" --no-logo-prompt
 
@@ -409,6 +972,16 @@ Image Editing Mode:
     parser.add_argument("--output", "-o", help="Output directory")
     parser.add_argument("--model", default="flash", choices=["flash", "pro"], help="Model: flash (fast) or pro (quality)")
     parser.add_argument("--ratio", default="1:1", help="Aspect ratio (1:1, 16:9, 4:3, etc.)")
+    parser.add_argument("--logo-max-dim", type=int, default=DEFAULT_LOGO_MAX_DIM,
+                        help=f"Downscale logo to fit NxN before upload (default: {DEFAULT_LOGO_MAX_DIM}, 0 = original)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Max concurrent API requests for --set/--deliverables (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--batch", action="store_true",
+                        help="Submit --set/--deliverables as one Gemini Batch API job (slower to finish, higher throughput)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always call the API instead of reusing cached images for identical requests")
+    parser.add_argument("--rpm", type=int,
+                        help="Max API requests per minute (default: 60 for flash, 10 for pro; 0 disables)")
     parser.add_argument("--prompt-only", action="store_true", help="Only show prompt, don't generate")
     parser.add_argument("--json", "-j", action="store_true", help="Output as JSON")
     parser.add_argument("--no-logo-prompt", action="store_true", help="Skip logo prompt, proceed without logo")
@@ -417,8 +990,13 @@ Image Editing Mode:
 
     # Check if logo is provided, prompt user if not
     logo_image = None
-    if args.logo:
-        logo_image = load_logo_image(args.logo)
+    if args.logo and args.prompt_only:
+        # The logo is never sent in prompt-only mode; don't decode it
+        if not Path(args.logo).exists():
+            print(f"Error: Logo file not found: {args.logo}")
+            sys.exit(1)
+    elif args.logo:
+        logo_image = load_logo_image(args.logo, args.logo_max_dim)
         if not logo_image:
             print("Error: Could not load logo image")
             sys.exit(1)
@@ -435,18 +1013,15 @@ Image Editing Mode:
             sys.exit(0)
         # else: continue without logo
 
-    use_logo = logo_image is not None
+    use_logo = bool(args.logo)
 
     if args.set or args.deliverables:
         # Generate multiple deliverables
         deliverables = args.deliverables.split(",") if args.deliverables else None
 
         if args.prompt_only:
-            results = []
-            deliverables = deliverables or ["business card", "letterhead", "office signage", "vehicle", "polo shirt"]
-            for d in deliverables:
-                prompt_data = build_cip_prompt(d, args.brand, args.style, args.industry, args.mockup, use_logo_image=use_logo)
-                results.append(prompt_data)
+            deliverables = deliverables or DEFAULT_DELIVERABLES
+            results = build_cip_prompts_batch(deliverables, args.brand, args.style, args.industry, args.mockup, use_logo_image=use_logo)
             if args.json:
                 print(json.dumps(results, indent=2))
             else:
@@ -455,12 +1030,17 @@ Image Editing Mode:
         else:
             results = generate_cip_set(
                 args.brand, args.industry, args.style, deliverables, args.output,
-                model_key=args.model, logo_path=args.logo, aspect_ratio=args.ratio
+                model_key=args.model, logo_image=logo_image, aspect_ratio=args.ratio,
+                concurrency=args.concurrency, rpm=args.rpm, logo_max_dim=args.logo_max_dim,
+                batch=args.batch, use_cache=not args.no_cache
             )
             if args.json:
                 print(json.dumps(results, indent=2))
             else:
-                print(f"\n✅ Generated {len(results)} CIP mockups")
+                failed = [r for r in results if "error" in r]
+                print(f"\n✅ Generated {len(results) - len(failed)} CIP mockups")
+                for r in failed:
+                    print(f"   ❌ {r['deliverable']}: {r['error']}")
     else:
         # Generate single deliverable
         deliverable = args.deliverable or "business card"
@@ -474,7 +1054,8 @@ Image Editing Mode:
         else:
             filepath = generate_with_nano_banana(
                 prompt_data, args.output, model_key=args.model,
-                aspect_ratio=args.ratio, logo_image=logo_image
+                aspect_ratio=args.ratio, logo_image=logo_image, rpm=args.rpm,
+                use_cache=not args.no_cache
             )
             if args.json:
                 print(json.dumps({"filepath": filepath, **prompt_data}, indent=2))
@@ -4,8 +4,6 @@
 CIP Design Search CLI - Search corporate identity design guidelines
 """
 
-import argparse
-import json
 import sys
 from pathlib import Path
 
@@ -63,6 +61,9 @@ def format_brief(brief):
 
 
 def main():
+    import argparse
+    import json
+
     parser = argparse.ArgumentParser(
         description="Search CIP design guidelines",
         formatter_class=argparse.RawDescriptionHelpFormatter,
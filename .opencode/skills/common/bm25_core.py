@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shared BM25 Core - ranking engine and CSV index cache for the skill search scripts
+
+Used by ai-artist and cip-design. Each skill keeps its own CSV_CONFIG and
+search()/detect_domain() and calls into this module for indexing and scoring,
+so indexes and compiled kernels are shared when both are loaded together.
+
+Usage:
+    import sys
+    from pathlib import Path
+
+    sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'common'))
+    from bm25_core import search_csv
+
+    results = search_csv(filepath, search_cols, output_cols, "query", 3)
+"""
+
+import csv
+import heapq
+import os
+import pickle
+import re
+from math import log
+from operator import itemgetter
+from collections import Counter
+
+# numpy and the compiled kernel are imported by _load_numpy() on the first corpus
+# large enough to vectorize; None until then, so small corpora never pay for them
+np = None
+score_terms = None
+NUMPY_AVAILABLE = None
+NUMBA_AVAILABLE = None
+
+
+# ============ BM25 IMPLEMENTATION ============
+# Tokens are runs of 3+ word characters; the regex does the split and length filter in C
+_TOKEN_RE = re.compile(r'\w{3,}')
+# Absorbs float rounding in MaxScore upper bounds so pruning never drops a tie
+_MAXSCORE_SLACK = 1e-9
+# Below this many documents the numpy import and array setup cost more than they
+# save over a CLI run; score in pure Python
+VECTOR_MIN_DOCS = 5000
+
+class BM25:
+    """BM25 ranking algorithm for text search"""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths = []
+        self.avgdl = 0
+        # Terms are interned to int ids at fit(); the per-term lists are indexed by id
+        self.vocab = {}
+        self.postings = []
+        self.idf = []
+        self.max_scores = []
+        self.N = 0
+
+    def tokenize(self, text):
+        """Lowercase, split, remove punctuation, filter short words"""
+        return _TOKEN_RE.findall(str(text).lower())
+
+    def query_terms(self, query):
+        """Ids of indexed query terms with their in-query frequency, e.g. 'a a b' -> {id_a: 2, id_b: 1}
+
+        query may be a string or a list already produced by tokenize().
+        """
+        tokens = self.tokenize(query) if isinstance(query, str) else query
+        vocab = self.vocab
+        return Counter(vocab[t] for t in tokens if t in vocab)
+
+    def fit(self, documents):
+        """Build BM25 index from documents"""
+        corpus = [self.tokenize(doc) for doc in documents]
+        self.N = len(corpus)
+        if self.N == 0:
+            return
+        self.doc_lengths = [len(doc) for doc in corpus]
+        self.avgdl = sum(self.doc_lengths) / self.N
+        if self.avgdl == 0:
+            # No document has an indexable token: leave the index empty so score() returns []
+            return
+
+        # Inverted index: term id -> [(doc_idx, impact), ...] in ascending doc order.
+        # The impact tf*(k1+1) / (tf + k1*(1-b+b*dl/avgdl)) depends only on the
+        # document, so scoring a query reduces to summing idf * impact.
+        k1_plus_1 = self.k1 + 1
+        vocab = self.vocab
+        for idx, doc in enumerate(corpus):
+            B = self.k1 * (1 - self.b + self.b * self.doc_lengths[idx] / self.avgdl)
+            for word, tf in Counter(doc).items():
+                term = vocab.get(word)
+                if term is None:
+                    term = vocab[word] = len(vocab)
+                    self.postings.append([])
+                self.postings[term].append((idx, tf * k1_plus_1 / (tf + B)))
+
+        for plist in self.postings:
+            freq = len(plist)
+            idf = log((self.N - freq + 0.5) / (freq + 0.5) + 1)
+            self.idf.append(idf)
+            # Upper bound of this term's contribution to any document (MaxScore)
+            self.max_scores.append(idf * max(impact for _, impact in plist))
+
+        if self._vectorized():
+            self._build_arrays()
+
+    def __getstate__(self):
+        # NumPy arrays are derived from the postings; rebuild them on load so a
+        # pickled index works whether or not numpy is available
+        state = self.__dict__.copy()
+        for attr in ("term_ptr", "post_docs", "post_impacts"):
+            state.pop(attr, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self._vectorized():
+            self._build_arrays()
+
+    def _vectorized(self):
+        """Whether scoring goes through the NumPy arrays (numpy installed and corpus not tiny)"""
+        return self.N >= VECTOR_MIN_DOCS and _load_numpy()
+
+    def _build_arrays(self):
+        """Flatten postings into parallel doc-id / impact arrays (SoA) for NumPy scoring
+
+        Term id t owns post_docs[term_ptr[t]:term_ptr[t + 1]] and the same slice of post_impacts.
+        """
+        self.term_ptr = [0]
+        for plist in self.postings:
+            self.term_ptr.append(self.term_ptr[-1] + len(plist))
+        nnz = self.term_ptr[-1]
+        self.post_docs = np.fromiter((idx for plist in self.postings for idx, _ in plist),
+                                     dtype=np.int32, count=nnz)
+        self.post_impacts = np.fromiter((impact for plist in self.postings for _, impact in plist),
+                                        dtype=np.float64, count=nnz)
+
+    def score(self, query, top_k=None):
+        """Return up to top_k (doc_idx, score) pairs with score > 0, best first
+
+        Scores term-at-a-time over postings; with a top_k the pure-Python path
+        prunes documents via MaxScore bounds. top_k=None returns every match.
+        query may be pre-tokenized (see query_terms).
+        """
+        if self._vectorized():
+            return self._score_numpy(query, top_k)
+
+        query_terms = self.query_terms(query)
+        terms = list(query_terms)
+        scores = {}
+
+        if top_k:
+            # MaxScore: visit high-impact terms first so the top-k threshold rises early.
+            # remaining[i] bounds what terms i.. can still add to any document.
+            terms.sort(key=lambda t: query_terms[t] * self.max_scores[t], reverse=True)
+            remaining = [0.0] * (len(terms) + 1)
+            for i in range(len(terms) - 1, -1, -1):
+                remaining[i] = remaining[i + 1] + query_terms[terms[i]] * self.max_scores[terms[i]]
+
+        for i, token in enumerate(terms):
+            weight = query_terms[token] * self.idf[token]
+            if top_k and len(scores) >= top_k:
+                threshold = heapq.nlargest(top_k, scores.values())[-1]
+                bound = remaining[i] + _MAXSCORE_SLACK
+                if bound < threshold:
+                    # No unseen document can reach the top k any more: only update
+                    # candidates that can still catch up with the threshold
+                    scores = {idx: s for idx, s in scores.items() if s + bound >= threshold}
+                    for idx, impact in self.postings[token]:
+                        if idx in scores:
+                            scores[idx] += weight * impact
+                    continue
+            for idx, impact in self.postings[token]:
+                scores[idx] = scores.get(idx, 0) + weight * impact
+
+        matches = ((idx, score) for idx, score in sorted(scores.items()) if score > 0)
+        if top_k is None:
+            return sorted(matches, key=itemgetter(1), reverse=True)
+        return heapq.nlargest(top_k, matches, key=itemgetter(1))
+
+    def _score_numpy(self, query, top_k):
+        """Vectorized score(): one array expression per query term"""
+        scores = np.zeros(self.N)
+
+        for token, qf in self.query_terms(query).items():
+            start, stop = self.term_ptr[token], self.term_ptr[token + 1]
+            doc_ids = self.post_docs[start:stop]
+            impacts = self.post_impacts[start:stop]
+            if NUMBA_AVAILABLE:
+                score_terms(scores, doc_ids, impacts, qf * self.idf[token])
+            else:
+                # doc ids are unique within a posting list, so fancy-index += is safe
+                scores[doc_ids] += qf * self.idf[token] * impacts
+
+        return _top_k(scores, top_k)
+
+    def score_batch(self, queries, top_k=None):
+        """Score several queries in one pass; returns one score()-style list per query"""
+        if not self._vectorized():
+            return [self.score(query, top_k) for query in queries]
+
+        query_terms = [self.query_terms(query) for query in queries]
+        batch_vocab = {t: j for j, t in enumerate(dict.fromkeys(t for terms in query_terms for t in terms))}
+
+        # (terms x docs) BM25 impacts, dense only over the terms this batch uses
+        weights = np.zeros((len(batch_vocab), self.N))
+        for token, j in batch_vocab.items():
+            start, stop = self.term_ptr[token], self.term_ptr[token + 1]
+            weights[j, self.post_docs[start:stop]] = self.post_impacts[start:stop]
+
+        # (queries x terms) query-term frequency times idf
+        query_weights = np.zeros((len(queries), len(batch_vocab)))
+        for i, terms in enumerate(query_terms):
+            for token, qf in terms.items():
+                query_weights[i, batch_vocab[token]] = qf * self.idf[token]
+
+        return [_top_k(row, top_k) for row in query_weights @ weights]
+
+
+def _load_numpy():
+    """Import numpy (and the bm25_ext kernel) on first use; returns whether numpy is installed"""
+    global np, score_terms, NUMPY_AVAILABLE, NUMBA_AVAILABLE
+    if NUMPY_AVAILABLE is None:
+        try:
+            import numpy as np
+            NUMPY_AVAILABLE = True
+        except ImportError:
+            NUMPY_AVAILABLE = False
+    if NUMBA_AVAILABLE is None:
+        # Only the ahead-of-time build from build_bm25_ext.py: importing numba and
+        # JIT-compiling bm25_numba costs more than the kernel saves in one CLI run
+        NUMBA_AVAILABLE = False
+        if NUMPY_AVAILABLE:
+            try:
+                from bm25_ext import score_terms
+                NUMBA_AVAILABLE = True
+            except ImportError:
+                pass
+    return NUMPY_AVAILABLE
+
+
+def _top_k(scores, k):
+    """Top-k positive entries of a score array as (idx, score), ties broken by lower idx"""
+    candidates = np.flatnonzero(scores > 0)
+    if k is not None and len(candidates) > k:
+        # Partial selection finds the k-th best score; keep everything tied with it so
+        # the stable sort below picks the same documents as a full sort would
+        kth = scores[candidates][np.argpartition(-scores[candidates], k - 1)[k - 1]]
+        candidates = candidates[scores[candidates] >= kth]
+    order = candidates[np.argsort(-scores[candidates], kind="stable")][:k]
+    return list(zip(order.tolist(), scores[order].tolist()))
+
+
+# ============ CSV INDEX ============
+# Parsed rows and fitted BM25 per (CSV file, search columns), reused until the file changes
+_INDEX_CACHE = {}
+# Bump when the pickled index layout changes so stale sidecar files are rebuilt
+_INDEX_FORMAT = 5
+
+
+def load_csv(filepath):
+    """Load CSV and return (column name -> index map, list of row tuples)
+
+    Short rows are padded with None and blank lines skipped, as csv.DictReader does.
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        width = len(header)
+        rows = [tuple(row[:width]) + (None,) * (width - len(row)) for row in reader if row]
+    # Later duplicate headers win, matching DictReader
+    columns = {col: i for i, col in enumerate(header)}
+    return columns, rows
+
+
+def get_index(filepath, search_cols):
+    """Return (rows, fitted BM25) for a CSV, rebuilding only when its mtime or size changes"""
+    stat = filepath.stat()
+    signature = (stat.st_mtime_ns, stat.st_size)
+    # The same CSV can be indexed over different columns by different callers
+    key = (filepath, tuple(search_cols))
+    cached = _INDEX_CACHE.get(key)
+    if cached and cached[0] == signature:
+        return cached[1], cached[2]
+
+    data, bm25 = _load_or_build_index(filepath, search_cols, signature)
+    _INDEX_CACHE[key] = (signature, data, bm25)
+    return data, bm25
+
+
+def _load_or_build_index(filepath, search_cols, signature):
+    """Load the pickled index stored next to the CSV, or build and store it
+
+    search.py runs once per shell command, so persisting the index skips CSV
+    parsing and BM25 fitting on every cold start. The sidecar is used only if
+    it was built from a CSV with exactly this (mtime, size) signature and for
+    the same search columns; comparing the two files' mtimes would miss a CSV
+    replaced by an older copy (tar/zip extraction, cp -p, rsync -a).
+    """
+    sidecar = filepath.with_suffix(".bm25.pkl")
+    try:
+        with open(sidecar, "rb") as f:
+            index = pickle.load(f)
+        if (index["format"] == _INDEX_FORMAT and index["csv"] == signature
+                and index["search_cols"] == list(search_cols)):
+            return index["rows"], index["bm25"]
+    except Exception:
+        pass  # missing, stale or unreadable sidecar: rebuild below
+
+    data, bm25 = build_index(filepath, search_cols)
+
+    index = {"format": _INDEX_FORMAT, "csv": signature, "search_cols": list(search_cols), "rows": data, "bm25": bm25}
+    tmp = sidecar.with_name(f"{sidecar.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, sidecar)
+    except OSError:
+        tmp.unlink(missing_ok=True)  # read-only install: keep the in-memory index only
+    return data, bm25
+
+
+def _row_getter(keys):
+    """itemgetter over keys that always returns a tuple, even for zero or one key"""
+    if len(keys) > 1:
+        return itemgetter(*keys)
+    if keys:
+        key = keys[0]
+        return lambda row: (row[key],)
+    return lambda row: ()
+
+
+def build_index(filepath, search_cols):
+    """Parse a CSV and fit BM25 over its search columns"""
+    columns, rows = load_csv(filepath)
+
+    # Build documents from search columns; a missing column only ever added whitespace
+    getter = _row_getter([columns[col] for col in search_cols if col in columns])
+    documents = [" ".join(map(str, getter(row))) for row in rows]
+
+    bm25 = BM25()
+    bm25.fit(documents)
+    return (columns, rows), bm25
+
+
+def project(data, ranked, output_cols):
+    """Turn ranked (idx, score) pairs into output rows"""
+    columns, rows = data
+    output_cols = [col for col in output_cols if col in columns]
+    getter = _row_getter([columns[col] for col in output_cols])
+    return [dict(zip(output_cols, getter(rows[idx]))) for idx, _ in ranked]
+
+
+def search_csv(filepath, search_cols, output_cols, query, max_results):
+    """Top max_results output rows of a CSV for query (a string or pre-tokenized list)"""
+    if not filepath.exists():
+        return []
+
+    data, bm25 = get_index(filepath, search_cols)
+
+    # Top results with score > 0
+    return project(data, bm25.score(query, max_results), output_cols)
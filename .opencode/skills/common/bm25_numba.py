@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shared BM25 Kernels - Numba scoring loops compiled into bm25_ext by build_bm25_ext.py
+"""
+
+from numba import njit
+
+# Postings are scored in fixed-size blocks so the inner loop has a constant trip count
+BLOCK_SIZE = 64
+
+
+@njit(cache=True)
+def _score_block(scores, doc_ids, impacts, start, idf):
+    """Accumulate one full block of postings starting at start"""
+    for i in range(start, start + BLOCK_SIZE):
+        scores[doc_ids[i]] += idf * impacts[i]
+
+
+@njit(cache=True)
+def score_terms(scores, doc_ids, impacts, idf):
+    """Accumulate one query term's precomputed BM25 impacts into scores"""
+    n = doc_ids.shape[0]
+    full = n - n % BLOCK_SIZE
+    for start in range(0, full, BLOCK_SIZE):
+        _score_block(scores, doc_ids, impacts, start, idf)
+    for i in range(full, n):
+        scores[doc_ids[i]] += idf * impacts[i]